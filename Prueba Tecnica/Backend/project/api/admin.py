@@ -6,10 +6,10 @@ from .models.shopping import ShoppingList, ShoppingListItem
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'brand', 'category', 'price', 'weight', 'nutriscore', 'ecoscore']
+    list_display = ['name', 'brand', 'category', 'price', 'weight', 'price_per_unit', 'nutriscore', 'ecoscore']
     list_filter = ['category', 'nutriscore', 'ecoscore', 'is_organic']
     search_fields = ['name', 'brand', 'barcode']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['price_per_unit', 'sustainability_score', 'created_at', 'updated_at']
 
 
 @admin.register(SustainabilityScore)
@@ -22,7 +22,7 @@ class SustainabilityScoreAdmin(admin.ModelAdmin):
 class ShoppingListItemInline(admin.TabularInline):
     model = ShoppingListItem
     extra = 0
-    readonly_fields = ['subtotal']
+    readonly_fields = ['subtotal', 'score_at_addition']
 
 
 @admin.register(ShoppingList)
@@ -0,0 +1,145 @@
+"""
+Distribuciones del catálogo con NumPy
+
+Recibe las columnas del catálogo como arrays (None -> NaN) y calcula en
+una pasada vectorizada:
+1. Histogramas de scores, precio y huella de carbono
+2. Cuantiles (p10/p50/p90) globales y por categoría, sin recorrer las
+   categorías en Python: se ordena por (categoría, valor) y se indexan
+   las posiciones de cada cuantil
+3. Reparto de calidad de datos (real_data / hybrid / calculated), con la
+   misma regla que Product.compute_data_quality
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+SCORE_BINS = np.linspace(0, 100, 11)
+PRICE_BINS = np.array([0, 1000, 2500, 5000, 10000, np.inf])
+CARBON_BINS = np.array([0, 100, 250, 500, 1000, np.inf])
+
+DATA_QUALITY_LABELS = ('real_data', 'hybrid', 'calculated')
+
+
+def _edges(bins: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isinf(edge) else float(edge) for edge in bins]
+
+
+def histogram(values: np.ndarray, bins: np.ndarray) -> Dict[str, Any]:
+    """Histograma ignorando NaN; la última clase incluye su borde superior"""
+    counts, _ = np.histogram(values[~np.isnan(values)], bins=bins)
+    return {'bins': _edges(bins), 'counts': counts.tolist()}
+
+
+def grouped_histogram(values: np.ndarray, codes: np.ndarray, n_groups: int, bins: np.ndarray) -> np.ndarray:
+    """Matriz (grupos x clases) con un solo bincount"""
+    mask = ~np.isnan(values)
+    n_bins = len(bins) - 1
+    positions = np.clip(np.searchsorted(bins, values[mask], side='right') - 1, 0, n_bins - 1)
+    flat = np.bincount(codes[mask] * n_bins + positions, minlength=n_groups * n_bins)
+    return flat.reshape(n_groups, n_bins)
+
+
+def grouped_quantiles(values: np.ndarray, codes: np.ndarray, n_groups: int,
+                      quantiles: Sequence[float] = QUANTILES) -> np.ndarray:
+    """
+    Cuantiles por grupo con interpolación lineal (como np.quantile).
+
+    Returns:
+        np.ndarray: (grupos x cuantiles); NaN en grupos sin valores
+    """
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    mask = ~np.isnan(values)
+    if not mask.any():
+        return result
+
+    values, codes = values[mask], codes[mask]
+    order = np.lexsort((values, codes))
+    values, codes = values[order], codes[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+
+    positions = starts[present, None] + np.asarray(quantiles)[None, :] * (counts[present, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    fraction = positions - lower
+    result[present] = values[lower] * (1 - fraction) + values[upper] * fraction
+    return result
+
+
+def data_quality_codes(carbon: np.ndarray, impact: np.ndarray, green: np.ndarray) -> np.ndarray:
+    """0 = real_data, 1 = hybrid, 2 = calculated (un valor 0 cuenta como ausente)"""
+    def present(column):
+        return ~np.isnan(column) & (column != 0)
+
+    has_carbon, has_green = present(carbon), present(green)
+    real = has_carbon & has_green
+    any_real = has_carbon | present(impact) | has_green
+    return np.where(real, 0, np.where(any_real, 1, 2))
+
+
+def _quantile_dict(row: np.ndarray) -> Dict[str, Optional[float]]:
+    return {
+        f'p{int(q * 100)}': None if np.isnan(value) else round(float(value), 2)
+        for q, value in zip(QUANTILES, row)
+    }
+
+
+def compute_distributions(columns: Dict[str, np.ndarray], categories: np.ndarray) -> Dict[str, Any]:
+    """
+    Args:
+        columns: arrays float (NaN = sin dato) con las claves price,
+            price_per_kg, carbon_footprint, environmental_impact_score,
+            green_score y los cuatro *_score de sostenibilidad
+        categories: array de categorías (str), alineado con las columnas
+    """
+    names, codes = np.unique(categories, return_inverse=True)
+    codes = codes.astype(np.int64)
+    n_groups = len(names)
+    overall = np.zeros(len(categories), dtype=np.int64)
+
+    quality = data_quality_codes(
+        columns['carbon_footprint'], columns['environmental_impact_score'], columns['green_score']
+    )
+    quality_by_category = np.bincount(codes * 3 + quality, minlength=n_groups * 3).reshape(n_groups, 3)
+    quality_total = np.bincount(quality, minlength=3)
+
+    quantile_fields = ('price', 'price_per_kg', 'total_score', 'carbon_footprint')
+    per_category = {
+        field: grouped_quantiles(columns[field], codes, n_groups) for field in quantile_fields
+    }
+    score_histograms = grouped_histogram(columns['total_score'], codes, n_groups, SCORE_BINS)
+    counts = np.bincount(codes, minlength=n_groups)
+
+    return {
+        'total_products': int(len(categories)),
+        'histograms': {
+            'total_score': histogram(columns['total_score'], SCORE_BINS),
+            'economic_score': histogram(columns['economic_score'], SCORE_BINS),
+            'environmental_score': histogram(columns['environmental_score'], SCORE_BINS),
+            'social_score': histogram(columns['social_score'], SCORE_BINS),
+            'price': histogram(columns['price'], PRICE_BINS),
+            'carbon_footprint': histogram(columns['carbon_footprint'], CARBON_BINS),
+        },
+        'quantiles': {
+            field: _quantile_dict(grouped_quantiles(columns[field], overall, 1)[0])
+            for field in quantile_fields
+        },
+        'data_quality': dict(zip(DATA_QUALITY_LABELS, quality_total.tolist())),
+        'categories': [
+            {
+                'category': str(name),
+                'count': int(counts[i]),
+                **{field: _quantile_dict(per_category[field][i]) for field in quantile_fields},
+                'total_score_histogram': score_histograms[i].tolist(),
+                'data_quality': dict(zip(DATA_QUALITY_LABELS, quality_by_category[i].tolist())),
+            }
+            for i, name in enumerate(names)
+        ],
+    }
@@ -0,0 +1,240 @@
+"""
+Motor de similitud de productos por vectores de características
+
+Cada producto se convierte en un vector numérico:
+1. Scores oficiales (nutriscore, ecoscore) normalizados a 0-1
+2. Huella de carbono, precio por kg y peso en escala logarítmica
+3. Flags (orgánico, comercio justo, local)
+4. Categoría en one-hot
+5. Embedding de tokens del nombre por hashing (feature hashing)
+
+Los vectores se guardan normalizados (L2) en una matriz contigua de NumPy,
+de modo que la similitud coseno es un producto matricial. Las consultas se
+resuelven por lotes con argpartition para obtener el top-k.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Sequence, Tuple, Any
+
+import numpy as np
+
+
+# Dimensión del embedding de tokens del nombre
+NAME_HASH_DIM = 64
+
+# Ponderación de cada bloque en la similitud coseno
+WEIGHT_SCORES = 1.0
+WEIGHT_NUMERIC = 1.0
+WEIGHT_FLAGS = 0.5
+WEIGHT_CATEGORY = 1.5
+WEIGHT_NAME = 2.0
+
+# Consultas procesadas por producto matricial
+QUERY_BATCH_SIZE = 256
+
+# Campos de Product necesarios para construir un vector
+FEATURE_FIELDS = (
+    'id', 'name', 'category', 'nutriscore', 'ecoscore', 'carbon_footprint',
+    'price_per_unit', 'weight', 'is_organic', 'is_fairtrade', 'is_local',
+)
+
+GRADE_VALUES = {'A': 1.0, 'B': 0.75, 'C': 0.5, 'D': 0.25, 'E': 0.0}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def _grade(value) -> float:
+    """Letra A-E a 0-1; sin dato = valor neutro"""
+    return GRADE_VALUES.get((value or '').upper(), 0.5)
+
+
+def _log_scale(value, upper: float) -> float:
+    """Escala logarítmica acotada a 0-1; sin dato = valor neutro"""
+    if value is None or value <= 0:
+        return 0.5
+    return min(math.log1p(value) / math.log1p(upper), 1.0)
+
+
+def tokenize(name: str) -> List[str]:
+    """Tokens en minúsculas y sin tildes ('Yogurt Batido' -> ['yogurt', 'batido'])"""
+    normalized = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    return [token for token in _TOKEN_RE.findall(normalized.lower()) if len(token) >= 3]
+
+
+def name_embedding(name: str) -> np.ndarray:
+    """
+    Embedding del nombre por feature hashing con signo.
+
+    Usa crc32 (estable entre procesos) en vez de hash() de Python.
+    """
+    vector = np.zeros(NAME_HASH_DIM, dtype=np.float32)
+    for token in tokenize(name):
+        digest = zlib.crc32(token.encode())
+        sign = 1.0 if digest & 1 else -1.0
+        vector[(digest >> 1) % NAME_HASH_DIM] += sign
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def build_feature_vector(row: Dict[str, Any], categories: Dict[str, int]) -> np.ndarray:
+    """
+    Construye el vector (sin normalizar) de un producto.
+
+    Args:
+        row: dict con los campos de FEATURE_FIELDS
+        categories: mapa categoría -> columna del one-hot
+    """
+    scores = np.array([
+        _grade(row['nutriscore']),
+        _grade(row['ecoscore']),
+    ], dtype=np.float32) * WEIGHT_SCORES
+
+    numeric = np.array([
+        1.0 - _log_scale(row['carbon_footprint'], 5000),  # menor huella = mayor valor
+        _log_scale(row['price_per_unit'], 100000),
+        _log_scale(row['weight'], 10000),
+    ], dtype=np.float32) * WEIGHT_NUMERIC
+
+    flags = np.array([
+        float(row['is_organic']),
+        float(row['is_fairtrade']),
+        float(row['is_local']),
+    ], dtype=np.float32) * WEIGHT_FLAGS
+
+    category = np.zeros(len(categories), dtype=np.float32)
+    if row['category'] in categories:
+        category[categories[row['category']]] = WEIGHT_CATEGORY
+
+    name = name_embedding(row['name']) * WEIGHT_NAME
+
+    return np.concatenate([scores, numeric, flags, name, category])
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class SimilarityIndex:
+    """
+    Índice en memoria de vectores de productos.
+
+    Las actualizaciones construyen arrays nuevos y publican la tupla
+    (ids, matriz, posiciones) de una sola vez (copy-on-write), así las
+    consultas concurrentes nunca ven un estado a medias.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._categories: Dict[str, int] = {}
+        self._state = (np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), {})
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def __contains__(self, product_id):
+        return product_id in self._state[2]
+
+    def build(self, rows: Iterable[Dict[str, Any]]):
+        """Reconstruye el índice completo"""
+        rows = {row['id']: dict(row) for row in rows}
+        with self._lock:
+            self._publish(rows)
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]):
+        """Agrega o actualiza productos"""
+        changed = {row['id']: dict(row) for row in rows}
+        if not changed:
+            return
+        with self._lock:
+            current = {**self._rows, **changed}
+            if any(row['category'] not in self._categories for row in changed.values()):
+                # Cambia la dimensión del one-hot: se reconstruye todo
+                self._publish(current)
+            else:
+                self._update_in_place(current, list(changed.values()))
+
+    def remove(self, product_ids: Iterable[int]):
+        """Elimina productos del índice"""
+        with self._lock:
+            ids, matrix, positions = self._state
+            removed = {pid for pid in product_ids if pid in positions}
+            if not removed:
+                return
+            keep = np.ones(len(ids), dtype=bool)
+            keep[[positions[pid] for pid in removed]] = False
+            ids = ids[keep]
+            self._rows = {pid: row for pid, row in self._rows.items() if pid not in removed}
+            self._state = (
+                ids,
+                np.ascontiguousarray(matrix[keep]),
+                {int(pid): i for i, pid in enumerate(ids)},
+            )
+
+    def _publish(self, rows: Dict[int, Dict[str, Any]]):
+        categories = {name: i for i, name in enumerate(sorted({row['category'] for row in rows.values()}))}
+        ids = np.fromiter(rows.keys(), dtype=np.int64, count=len(rows))
+        if rows:
+            matrix = _normalize_rows(np.vstack([build_feature_vector(row, categories) for row in rows.values()]))
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self._categories = categories
+        self._rows = rows
+        self._state = (ids, matrix, {int(pid): i for i, pid in enumerate(ids)})
+
+    def _update_in_place(self, current: Dict[int, Dict[str, Any]], changed: List[Dict[str, Any]]):
+        old_ids, old_matrix, old_positions = self._state
+        new_ids = [row['id'] for row in changed if row['id'] not in old_positions]
+
+        ids = np.concatenate([old_ids, np.array(new_ids, dtype=np.int64)])
+        positions = dict(old_positions)
+        for offset, pid in enumerate(new_ids):
+            positions[pid] = len(old_ids) + offset
+
+        vectors = _normalize_rows(np.vstack([build_feature_vector(row, self._categories) for row in changed]))
+        matrix = np.empty((len(ids), vectors.shape[1]), dtype=np.float32)
+        matrix[:len(old_ids)] = old_matrix
+        matrix[[positions[row['id']] for row in changed]] = vectors
+
+        self._rows = current
+        self._state = (ids, matrix, positions)
+
+    def top_k(self, product_ids: Sequence[int], k: int = 5) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Top-k productos más similares (coseno) para cada id consultado.
+
+        Returns:
+            dict: {product_id: [(similar_id, similarity), ...]}; los ids que no
+            están en el índice se omiten
+        """
+        ids, matrix, positions = self._state
+        queries = [pid for pid in product_ids if pid in positions]
+        if not queries or len(ids) < 2 or k < 1:
+            return {pid: [] for pid in queries}
+
+        k = min(k, len(ids) - 1)
+        result = {}
+        for start in range(0, len(queries), QUERY_BATCH_SIZE):
+            batch = queries[start:start + QUERY_BATCH_SIZE]
+            rows = np.array([positions[pid] for pid in batch])
+            similarities = matrix[rows] @ matrix.T
+            similarities[np.arange(len(batch)), rows] = -np.inf  # excluir el propio producto
+
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+            for i, pid in enumerate(batch):
+                result[pid] = [
+                    (int(ids[col]), round(float(score), 4))
+                    for col, score in zip(candidates[i], candidate_scores[i])
+                ]
+        return result
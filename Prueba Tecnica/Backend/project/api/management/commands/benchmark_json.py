@@ -0,0 +1,107 @@
+import io
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.algorithms.knapsack import knapsack_multi_objective
+from api.models import Product, ShoppingList
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import ProductSerializer, ShoppingListSerializer
+from api.serializers.fast_list import FastProductListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara el JSON de DRF (stdlib) con FastJSONRenderer/FastJSONParser'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Repeticiones por medición; se reporta la mejor'
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson no está instalado: ambos caminos usan la stdlib'))
+
+        shapes = self._response_shapes()
+        if not shapes:
+            self.stdout.write(self.style.ERROR('No hay productos. Ejecuta primero seed_products.'))
+            return
+
+        repeat = options['repeat']
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        stdlib_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        self.stdout.write(
+            f'{"respuesta":<28} {"KB":>7} {"render std":>11} {"render fast":>12} '
+            f'{"parse std":>10} {"parse fast":>11}'
+        )
+        for name, data in shapes:
+            body = stdlib.render(data)
+            if fast.render(data) != body:
+                self.stdout.write(self.style.WARNING(f'{name}: salida distinta (ver api/renderers.py)'))
+
+            timings = [
+                self._best(repeat, lambda: stdlib.render(data)),
+                self._best(repeat, lambda: fast.render(data)),
+                self._best(repeat, lambda: stdlib_parser.parse(io.BytesIO(body))),
+                self._best(repeat, lambda: fast_parser.parse(io.BytesIO(body))),
+            ]
+            self.stdout.write(
+                f'{name:<28} {len(body) / 1024:>7.1f} '
+                + ' '.join(f'{t * 1000:>{w}.3f}' for t, w in zip(timings, (11, 12, 10, 11)))
+            )
+        self.stdout.write('(tiempos en ms, mejor de cada serie)')
+
+    def _best(self, repeat, func):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def _response_shapes(self):
+        """Payloads con la forma de respuestas reales de la API"""
+        products = list(Product.objects.select_related('sustainability').order_by('id')[:100])
+        if not products:
+            return []
+
+        fast = FastProductListSerializer()
+        queryset = Product.objects.order_by('id')
+        shapes = [
+            ('products?page_size=20', {
+                'count': len(products), 'next': None, 'previous': None,
+                'results': fast.serialize(fast.prepare(queryset)[:20]),
+            }),
+            ('products?page_size=100', {
+                'count': len(products), 'next': None, 'previous': None,
+                'results': fast.serialize(fast.prepare(queryset)[:100]),
+            }),
+            ('products/bulk (detalle)', {
+                'results': ProductSerializer(products, many=True).data,
+            }),
+        ]
+
+        # optimize repite la lista original completa en la respuesta
+        items = [
+            {
+                'product_id': product.id,
+                'name': product.name,
+                'price': float(product.price),
+                'quantity': 1 + product.id % 3,
+                'sustainability_score': product.sustainability_score or 50,
+                'weight': product.weight,
+            }
+            for product in products
+        ]
+        budget = sum(item['price'] * item['quantity'] for item in items) * 0.6
+        shapes.append(('shopping-lists/optimize', knapsack_multi_objective(items, budget)))
+
+        shopping_list = ShoppingList.objects.prefetch_related('items__product__sustainability').first()
+        if shopping_list is not None:
+            shapes.append(('shopping-lists/{id}', ShoppingListSerializer(shopping_list).data))
+        return shapes
@@ -0,0 +1,97 @@
+import time
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from api.models import Product
+from api.serializers import ProductListSerializer
+from api.serializers.fast_list import FastProductListSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara ProductListSerializer con FastProductListSerializer (filas/segundo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[20, 100, 1000],
+            help='Tamaños de página a medir (por defecto 20 100 1000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Repeticiones por medición; se reporta la mejor'
+        )
+
+    def handle(self, *args, **options):
+        sizes = options['rows']
+        try:
+            with transaction.atomic():
+                self._fill_catalog(max(sizes))
+                self._run(sizes, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _fill_catalog(self, size):
+        """Completa con copias de productos existentes (se revierte al final)"""
+        existing = list(Product.objects.all()[:size])
+        missing = size - len(existing)
+        if missing <= 0:
+            return
+        if not existing:
+            self.stdout.write(self.style.ERROR('No hay productos. Ejecuta primero seed_products.'))
+            raise _Rollback
+
+        copies = []
+        for i in range(missing):
+            source = existing[i % len(existing)]
+            values = {
+                field.attname: getattr(source, field.attname)
+                for field in Product._meta.concrete_fields
+                if not field.primary_key
+            }
+            values['barcode'] = f'bench-{i:07d}'
+            copies.append(Product(**values))
+        Product.objects.bulk_create(copies)
+        self.stdout.write(f'(+{missing} productos temporales para la medición)')
+
+    def _best(self, repeat, func):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def _run(self, sizes, repeat):
+        renderer = JSONRenderer()
+        queryset = Product.objects.select_related('sustainability').order_by('id')
+        fragments = caches['fragments']
+        fast = FastProductListSerializer()
+
+        def drf(size):
+            # Sin caché de fragmentos: se mide la serialización completa
+            fragments.clear()
+            return renderer.render(ProductListSerializer(queryset[:size], many=True).data)
+
+        def fast_path(size):
+            return renderer.render(fast.serialize(fast.prepare(queryset)[:size]))
+
+        self.stdout.write(f'{"filas":>6} {"DRF (ms)":>10} {"rápido (ms)":>12} {"aceleración":>12}')
+        for size in sizes:
+            if drf(size) != fast_path(size):
+                self.stdout.write(self.style.ERROR(f'Salida distinta con {size} filas'))
+            drf_time = self._best(repeat, lambda: drf(size))
+            fast_time = self._best(repeat, lambda: fast_path(size))
+            self.stdout.write(
+                f'{size:>6} {drf_time * 1000:>10.2f} {fast_time * 1000:>12.2f} '
+                f'{drf_time / fast_time:>11.1f}x'
+            )
@@ -15,7 +15,9 @@ Parámetros opcionales:
 from django.core.management.base import BaseCommand
 from api.models.product import Product
 from api.models.sustainability import SustainabilityScore
+from api.models.ecoscore import ProductEcoscoreData
 from api.algorithms.scoring import calculate_sustainability_scores
+from api.services.alternatives import deferred_rebuild
 import requests
 import random
 import time
@@ -313,6 +315,11 @@ class Command(BaseCommand):
         parser.add_argument('--debug', action='store_true', help='Modo debug con logs detallados')
 
     def handle(self, *args, **options):
+        # Las alternativas precalculadas se reconstruyen una sola vez al final
+        with deferred_rebuild():
+            self._import(**options)
+
+    def _import(self, **options):
         limit = options['limit']
         clear = options['clear']
         timeout = options['timeout']
@@ -398,10 +405,12 @@ class Command(BaseCommand):
                                 environmental_impact_score=product_data.get('environmental_impact_score'),
                                 green_score=product_data.get('green_score'),
                                 packaging_score=product_data.get('packaging_score'),
-                                ecoscore_data=product_data.get('ecoscore_data'),
                                 data_source=product_data.get('data_source', 'manual'),
                             )
 
+                            # El JSON completo del Eco-Score va en tabla aparte
+                            ProductEcoscoreData.store(product, product_data.get('ecoscore_data'))
+
                             # CORREGIDO: Registrar stats DESPUÉS de crear
                             importer.record_stats(product)
 
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.services.alternatives import rebuild_alternatives
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de alternativas precalculadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category',
+            action='append',
+            help='Categoría a reconstruir (se puede repetir). Por defecto todas.'
+        )
+
+    def handle(self, *args, **options):
+        categories = options['category']
+        rows = rebuild_alternatives(categories)
+        scope = ', '.join(categories) if categories else 'todas las categorías'
+        self.stdout.write(self.style.SUCCESS(f'✓ {rows} alternativas generadas ({scope})'))
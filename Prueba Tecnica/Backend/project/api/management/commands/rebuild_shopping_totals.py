@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from api.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Verifica los totales de las listas de compras contra sus items y corrige los desfasados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            type=int,
+            action='append',
+            dest='lists',
+            help='ID de la lista a verificar (se puede repetir). Por defecto todas.'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo reportar las listas desfasadas, sin corregirlas'
+        )
+
+    def handle(self, *args, **options):
+        stale = ShoppingList.objects.refresh(options['lists'], dry_run=options['check'])
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('✓ Todos los totales coinciden con los items'))
+            return
+
+        ids = ', '.join(str(list_id) for list_id in stale)
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f'{len(stale)} listas con totales desfasados: {ids}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(stale)} listas recalculadas: {ids}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api.models import CategoryStats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero las estadísticas materializadas por categoría'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category',
+            action='append',
+            help='Categoría a recalcular (se puede repetir). Por defecto todas.'
+        )
+
+    def handle(self, *args, **options):
+        categories = options['category']
+        rows = CategoryStats.objects.refresh(categories)
+        scope = ', '.join(categories) if categories else 'todas las categorías'
+        self.stdout.write(self.style.SUCCESS(f'✓ {rows} categorías recalculadas ({scope})'))
@@ -2,12 +2,18 @@ from django.core.management.base import BaseCommand
 from api.models.product import Product
 from api.models.sustainability import SustainabilityScore
 from api.algorithms.scoring import calculate_sustainability_scores
+from api.services.alternatives import deferred_rebuild
 
 
 class Command(BaseCommand):
     help = 'Pobla la base de datos con productos chilenos de ejemplo'
 
     def handle(self, *args, **options):
+        # Las alternativas precalculadas se reconstruyen una sola vez al final
+        with deferred_rebuild():
+            self._seed()
+
+    def _seed(self):
         self.stdout.write(self.style.SUCCESS('Iniciando seed de productos...'))
         
         # Eliminar productos existentes si los hay
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2025-11-21 10:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_ordering_columns(apps, schema_editor):
+    """Rellena price_per_unit y sustainability_score para filas existentes"""
+    Product = apps.get_model('api', 'Product')
+    SustainabilityScore = apps.get_model('api', 'SustainabilityScore')
+    
+    products = list(Product.objects.only('id', 'price', 'weight'))
+    for product in products:
+        if product.weight and product.weight > 0:
+            product.price_per_unit = round(float(product.price) * 1000 / product.weight, 2)
+    Product.objects.bulk_update(products, ['price_per_unit'], batch_size=500)
+    
+    Product.objects.update(sustainability_score=Subquery(
+        SustainabilityScore.objects.filter(product_id=OuterRef('pk')).values('total_score')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_product_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='price_per_unit',
+            field=models.FloatField(blank=True, db_index=True, help_text='Precio por kg (CLP/kg), calculado desde price y weight', null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sustainability_score',
+            field=models.FloatField(blank=True, db_index=True, help_text='Copia de SustainabilityScore.total_score para ordenar sin join', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['carbon_footprint'], name='product_carbon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at'], name='product_created_idx'),
+        ),
+        migrations.RunPython(populate_ordering_columns, migrations.RunPython.noop),
+    ]
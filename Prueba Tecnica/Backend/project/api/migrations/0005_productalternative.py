@@ -0,0 +1,56 @@
+# Generated by Django 5.0.1 on 2025-11-21 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_alternatives(apps, schema_editor):
+    """Genera las top-5 alternativas iniciales para todo el catálogo"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO api_productalternative (product_id, alternative_id, position)
+            SELECT product_id, alternative_id, position FROM (
+                SELECT
+                    p.id AS product_id,
+                    a.id AS alternative_id,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY p.id
+                        ORDER BY
+                            CASE WHEN a.sustainability_score IS NULL THEN 1 ELSE 0 END,
+                            a.sustainability_score DESC,
+                            a.id
+                    ) AS position
+                FROM api_product p
+                JOIN api_product a
+                    ON a.category = p.category
+                    AND a.id <> p.id
+                    AND a.price <= p.price * 1.2
+            ) ranked
+            WHERE position <= 5
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAlternative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('alternative', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materialized_alternatives', to='api.product')),
+            ],
+            options={
+                'verbose_name': 'Alternativa de producto',
+                'verbose_name_plural': 'Alternativas de productos',
+                'ordering': ['product', 'position'],
+                'unique_together': {('product', 'position')},
+            },
+        ),
+        migrations.RunPython(populate_alternatives, migrations.RunPython.noop),
+    ]
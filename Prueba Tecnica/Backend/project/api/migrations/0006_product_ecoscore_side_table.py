@@ -0,0 +1,95 @@
+# Generated by Django 5.0.1 on 2025-11-21 16:40
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Debe coincidir con ProductEcoscoreData.COMPRESSION_THRESHOLD
+COMPRESSION_THRESHOLD = 512
+
+
+def _encode(data):
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(raw) >= COMPRESSION_THRESHOLD:
+        return zlib.compress(raw), True
+    return raw, False
+
+
+def move_ecoscore_data(apps, schema_editor):
+    """Copia Product.ecoscore_data a la tabla aparte"""
+    Product = apps.get_model('api', 'Product')
+    ProductEcoscoreData = apps.get_model('api', 'ProductEcoscoreData')
+    
+    rows = (
+        Product.objects
+        .exclude(ecoscore_data__isnull=True)
+        .values_list('id', 'ecoscore_data')
+        .iterator(chunk_size=500)
+    )
+    batch = []
+    now = timezone.now()
+    for product_id, data in rows:
+        if not data:
+            continue
+        payload, compressed = _encode(data)
+        batch.append(ProductEcoscoreData(
+            product_id=product_id, payload=payload, compressed=compressed, updated_at=now
+        ))
+        if len(batch) >= 500:
+            ProductEcoscoreData.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ProductEcoscoreData.objects.bulk_create(batch)
+    
+    Product.objects.filter(
+        id__in=ProductEcoscoreData.objects.values('product_id')
+    ).update(has_ecoscore_data=True)
+
+
+def restore_ecoscore_data(apps, schema_editor):
+    """Vuelve a copiar el JSON a Product.ecoscore_data"""
+    Product = apps.get_model('api', 'Product')
+    ProductEcoscoreData = apps.get_model('api', 'ProductEcoscoreData')
+    
+    for details in ProductEcoscoreData.objects.iterator(chunk_size=500):
+        raw = bytes(details.payload)
+        if details.compressed:
+            raw = zlib.decompress(raw)
+        Product.objects.filter(pk=details.product_id).update(ecoscore_data=json.loads(raw))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_productalternative'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductEcoscoreData',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ecoscore_details', serialize=False, to='api.product')),
+                ('payload', models.BinaryField()),
+                ('compressed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Datos Eco-Score',
+                'verbose_name_plural': 'Datos Eco-Score',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='has_ecoscore_data',
+            field=models.BooleanField(default=False, help_text='Indica si hay datos completos del Eco-Score (ver ProductEcoscoreData)'),
+        ),
+        migrations.RunPython(move_ecoscore_data, restore_ecoscore_data),
+        migrations.RemoveField(
+            model_name='product',
+            name='ecoscore_data',
+        ),
+    ]
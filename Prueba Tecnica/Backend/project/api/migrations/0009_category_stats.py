@@ -0,0 +1,72 @@
+# Generated by Django 5.0.1 on 2025-11-24 09:40
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+SCORE_FIELDS = ('total_score', 'economic_score', 'environmental_score', 'social_score')
+
+
+def populate_category_stats(apps, schema_editor):
+    """Calcula las estadísticas de las filas existentes"""
+    Product = apps.get_model('api', 'Product')
+    SustainabilityScore = apps.get_model('api', 'SustainabilityScore')
+    CategoryStats = apps.get_model('api', 'CategoryStats')
+    
+    rows = {
+        row['category']: CategoryStats(
+            category=row['category'],
+            product_count=row['count'],
+            price_sum=row['price_sum'] or 0,
+            price_min=row['price_min'],
+            price_max=row['price_max'],
+        )
+        for row in Product.objects.order_by().values('category').annotate(
+            count=Count('id'),
+            price_sum=Sum('price'),
+            price_min=Min('price'),
+            price_max=Max('price'),
+        )
+    }
+    score_rows = SustainabilityScore.objects.order_by().values('product__category').annotate(
+        count=Count('id'),
+        **{f'{field}_sum': Sum(field) for field in SCORE_FIELDS}
+    )
+    for row in score_rows:
+        stats = rows[row['product__category']]
+        stats.score_count = row['count']
+        for field in SCORE_FIELDS:
+            setattr(stats, f'{field}_sum', row[f'{field}_sum'] or 0)
+    
+    CategoryStats.objects.bulk_create(rows.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_product_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('category', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('product_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('score_count', models.IntegerField(default=0)),
+                ('total_score_sum', models.FloatField(default=0)),
+                ('economic_score_sum', models.FloatField(default=0)),
+                ('environmental_score_sum', models.FloatField(default=0)),
+                ('social_score_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de categoría',
+                'verbose_name_plural': 'Estadísticas por categoría',
+            },
+        ),
+        migrations.RunPython(populate_category_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1 on 2025-11-25 10:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+
+def populate_running_totals(apps, schema_editor):
+    """Guarda el score actual de cada item y recalcula los totales de las listas"""
+    ShoppingList = apps.get_model('api', 'ShoppingList')
+    ShoppingListItem = apps.get_model('api', 'ShoppingListItem')
+    SustainabilityScore = apps.get_model('api', 'SustainabilityScore')
+    
+    ShoppingListItem.objects.update(
+        score_at_addition=Subquery(
+            SustainabilityScore.objects
+            .filter(product_id=OuterRef('product_id'))
+            .values('total_score')[:1]
+        )
+    )
+    
+    rows = ShoppingListItem.objects.order_by().values('shopping_list_id').annotate(
+        total_price=Sum('subtotal'),
+        total_items=Sum('quantity'),
+        score_sum=Sum('score_at_addition'),
+        score_count=Count('score_at_addition'),
+    )
+    totals = {row['shopping_list_id']: row for row in rows}
+    
+    lists = list(ShoppingList.objects.all())
+    for shopping_list in lists:
+        row = totals.get(shopping_list.id)
+        shopping_list.total_price = row['total_price'] if row else 0
+        shopping_list.total_items = row['total_items'] if row else 0
+        shopping_list.score_sum = (row['score_sum'] or 0) if row else 0
+        shopping_list.score_count = row['score_count'] if row else 0
+        shopping_list.average_score = (
+            shopping_list.score_sum / shopping_list.score_count if shopping_list.score_count else 0
+        )
+    ShoppingList.objects.bulk_update(
+        lists,
+        ['total_price', 'total_items', 'score_sum', 'score_count', 'average_score'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_category_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='score_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='score_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shoppinglistitem',
+            name='score_at_addition',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_running_totals, migrations.RunPython.noop),
+    ]
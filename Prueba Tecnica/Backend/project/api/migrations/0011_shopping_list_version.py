@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2025-11-26 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_shopping_list_running_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
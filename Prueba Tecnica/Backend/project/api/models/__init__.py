@@ -1,10 +1,20 @@
 from .product import Product
 from .sustainability import SustainabilityScore
 from .shopping import ShoppingList, ShoppingListItem
+from .alternative import ProductAlternative
+from .ecoscore import ProductEcoscoreData
+from .catalog import CatalogVersion
+from .tombstone import ProductTombstone
+from .stats import CategoryStats
 
 __all__ = [
     'Product',
     'SustainabilityScore',
     'ShoppingList',
     'ShoppingListItem',
+    'ProductAlternative',
+    'ProductEcoscoreData',
+    'CatalogVersion',
+    'ProductTombstone',
+    'CategoryStats',
 ]
\ No newline at end of file
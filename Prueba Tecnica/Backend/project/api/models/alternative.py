@@ -0,0 +1,33 @@
+from django.db import models
+from api.models.product import Product
+
+
+class ProductAlternative(models.Model):
+    """
+    Top-K alternativas precalculadas para cada producto.
+    
+    Misma categoría, hasta 120% del precio y ordenadas por score de
+    sostenibilidad. Se reconstruye por categoría con
+    api.services.alternatives.rebuild_alternatives.
+    """
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='materialized_alternatives'
+    )
+    alternative = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    position = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['product', 'position']
+        unique_together = ['product', 'position']
+        verbose_name = 'Alternativa de producto'
+        verbose_name_plural = 'Alternativas de productos'
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.alternative_id} (#{self.position})"
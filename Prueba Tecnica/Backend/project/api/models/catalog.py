@@ -0,0 +1,62 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+GLOBAL_VERSION_KEY = '__all__'
+
+
+def category_version_key(category):
+    return f'category:{category}'
+
+
+class CatalogVersionManager(models.Manager):
+    
+    def bump(self, categories=()):
+        """
+        Incrementa la versión global y la de cada categoría indicada.
+        
+        Debe llamarse dentro de la transacción de la escritura que lo
+        provoca, así la versión y los datos se confirman juntos.
+        """
+        keys = {GLOBAL_VERSION_KEY} | {category_version_key(c) for c in categories if c is not None}
+        with transaction.atomic(using=self.db):
+            updated = self.filter(key__in=keys).update(
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+            if updated == len(keys):
+                return
+            
+            missing = keys - set(self.filter(key__in=keys).values_list('key', flat=True))
+            for key in missing:
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.create(key=key, version=1)
+                except IntegrityError:
+                    # Otra transacción la creó entre medio
+                    self.filter(key=key).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class CatalogVersion(models.Model):
+    """
+    Contador monótono de cambios del catálogo.
+    
+    Hay una fila global (key='__all__') y una por categoría
+    (key='category:<nombre>'). Se incrementa en la misma transacción que
+    las escrituras de Product / SustainabilityScore y se usa para construir
+    claves de caché (ver api.services.catalog_version).
+    """
+    
+    key = models.CharField(max_length=150, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = CatalogVersionManager()
+    
+    class Meta:
+        verbose_name = 'Versión del catálogo'
+        verbose_name_plural = 'Versiones del catálogo'
+    
+    def __str__(self):
+        return f"{self.key}: v{self.version}"
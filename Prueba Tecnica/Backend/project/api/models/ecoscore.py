@@ -0,0 +1,78 @@
+import json
+import zlib
+from django.db import models, transaction
+from api.models.product import Product
+
+
+class ProductEcoscoreData(models.Model):
+    """
+    JSON completo del Eco-Score de Open Food Facts.
+    
+    Se guarda fuera de la fila de Product para que los recorridos del
+    catálogo no carguen el blob; solo lo lee el endpoint ecoscore-details.
+    Los payloads grandes se comprimen con zlib.
+    """
+    
+    # Tamaño (bytes de JSON) a partir del cual se comprime
+    COMPRESSION_THRESHOLD = 512
+    
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ecoscore_details'
+    )
+    payload = models.BinaryField()
+    compressed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Datos Eco-Score'
+        verbose_name_plural = 'Datos Eco-Score'
+    
+    def __str__(self):
+        return f"Eco-Score de {self.product_id}"
+    
+    @property
+    def data(self):
+        """JSON decodificado (descomprimido si corresponde)"""
+        raw = bytes(self.payload)
+        if self.compressed:
+            raw = zlib.decompress(raw)
+        return json.loads(raw)
+    
+    @data.setter
+    def data(self, value):
+        raw = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.compressed = len(raw) >= self.COMPRESSION_THRESHOLD
+        self.payload = zlib.compress(raw) if self.compressed else raw
+    
+    @classmethod
+    def store(cls, product, data):
+        """Guarda (o elimina si data es vacío) el Eco-Score de un producto"""
+        if not data:
+            existing = cls.objects.filter(product=product).first()
+            if existing:
+                existing.delete()
+            return None
+        
+        details = cls(product=product)
+        details.data = data
+        details.save()
+        return details
+    
+    def save(self, *args, **kwargs):
+        """Marca el producto como poseedor de datos detallados"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._sync_product_flag(True)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._sync_product_flag(False)
+            return super().delete(*args, **kwargs)
+    
+    def _sync_product_flag(self, value):
+        Product.objects.filter(pk=self.product_id).update(has_ecoscore_data=value)
+        if self._meta.get_field('product').is_cached(self):
+            self.product.has_ecoscore_data = value
@@ -1,5 +1,87 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from decimal import Decimal
+from api.models.catalog import CatalogVersion
+from api.models.stats import CategoryStats
+
+
+def _mark_categories_dirty(categories):
+    # Import local: api.services.alternatives importa este módulo
+    from api.services.alternatives import mark_category_dirty
+    for category in categories:
+        mark_category_dirty(category)
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    Las escrituras masivas también incrementan la versión del catálogo,
+    mantienen CategoryStats, programan la reconstrucción de las alternativas
+    de las categorías afectadas y, como save(), actualizan updated_at (clave
+    de la caché de fragmentos).
+    """
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.price_per_unit = self.model.compute_price_per_unit(obj.price, obj.weight)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            CatalogVersion.objects.bump({obj.category for obj in objs})
+            _mark_categories_dirty({obj.category for obj in objs})
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # No se sabe qué filas se insertaron realmente
+                CategoryStats.objects.refresh({obj.category for obj in objs})
+            else:
+                self._add_to_stats(objs)
+        return created
+    
+    def _add_to_stats(self, objs):
+        by_category = {}
+        for obj in objs:
+            count, total = by_category.get(obj.category, (0, Decimal(0)))
+            by_category[obj.category] = (count + 1, total + Decimal(str(obj.price)))
+        for category, (count, total) in by_category.items():
+            CategoryStats.objects.apply_delta(category, product_count=count, price_sum=total, prices_changed=True)
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'price' in fields or 'weight' in fields:
+            for obj in objs:
+                obj.price_per_unit = self.model.compute_price_per_unit(obj.price, obj.weight)
+            if 'price_per_unit' not in fields:
+                fields.append('price_per_unit')
+        if 'updated_at' not in fields:
+            now = timezone.now()
+            for obj in objs:
+                obj.updated_at = now
+            fields.append('updated_at')
+        with transaction.atomic(using=self.db):
+            categories = {obj.category for obj in objs}
+            if 'category' in fields:
+                categories |= set(
+                    self.filter(pk__in=[obj.pk for obj in objs]).values_list('category', flat=True)
+                )
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            CatalogVersion.objects.bump(categories)
+            _mark_categories_dirty(categories)
+            if 'price' in fields or 'category' in fields:
+                CategoryStats.objects.refresh(categories)
+        return rows
+    
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            categories = set(self.order_by().values_list('category', flat=True).distinct())
+            rows = super().update(**kwargs)
+            if rows:
+                if isinstance(kwargs.get('category'), str):
+                    categories.add(kwargs['category'])
+                CatalogVersion.objects.bump(categories)
+                _mark_categories_dirty(categories)
+                if 'price' in kwargs or 'category' in kwargs:
+                    CategoryStats.objects.refresh(categories)
+        return rows
 
 
 class Product(models.Model):
@@ -59,11 +141,24 @@ class Product(models.Model):
         help_text='Impacto del empaquetado calculado por Open Food Facts'
     )
     
-    # Ecoscore
-    ecoscore_data = models.JSONField(
+    # Ecoscore: el JSON completo vive en ProductEcoscoreData
+    has_ecoscore_data = models.BooleanField(
+        default=False,
+        help_text='Indica si hay datos completos del Eco-Score (ver ProductEcoscoreData)'
+    )
+    
+    # Columnas desnormalizadas (indexadas) para ordenar el catálogo sin joins
+    price_per_unit = models.FloatField(
         null=True,
         blank=True,
-        help_text='Datos completos del Eco-Score de Open Food Facts (JSON)'
+        db_index=True,
+        help_text='Precio por kg (CLP/kg), calculado desde price y weight'
+    )
+    sustainability_score = models.FloatField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text='Copia de SustainabilityScore.total_score para ordenar sin join'
     )
     
     # Origen de los datos
@@ -77,52 +172,134 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['carbon_footprint'], name='product_carbon_idx'),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+            # Cursor de /changes/ (keyset sobre updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+            # Combinaciones de filtros de ProductViewSet.get_queryset
+            models.Index(fields=['category', 'price'], name='product_cat_price_idx'),
+            models.Index(fields=['category', 'sustainability_score'], name='product_cat_score_idx'),
+            # Índices parciales: Django compila is_organic=True como "WHERE is_organic",
+            # por lo que un índice compuesto sobre el booleano no se usaría
+            models.Index(fields=['price'], condition=models.Q(is_organic=True), name='product_organic_price_idx'),
+            models.Index(fields=['price'], condition=models.Q(is_local=True), name='product_local_price_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.brand})"
     
-    @property
-    def has_real_environmental_data(self):
-        """Verifica si tiene datos reales de impacto ambiental"""
-        return bool(
-            self.carbon_footprint or 
-            self.environmental_impact_score or 
-            self.green_score
-        )
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Categoría y precio originales, para invalidar también la categoría
+        # anterior si cambia y aplicar deltas a CategoryStats
+        instance._original_category = instance.__dict__.get('category')
+        instance._original_price = instance.__dict__.get('price')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Mantiene actualizado el precio por kg desnormalizado.
+        
+        Es atómico para que los receptores de post_save (versión del
+        catálogo) se confirmen en la misma transacción.
+        """
+        self.price_per_unit = self.compute_price_per_unit(self.price, self.weight)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'price_per_unit' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['price_per_unit']
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._original_category = self.category
+        self._original_price = self.price
     
     @property
-    def environmental_quality(self):
-        """Retorna categoría de calidad ambiental basada en datos reales"""
-        if not self.has_real_environmental_data:
+    def affected_categories(self):
+        """Categoría actual y, si cambió desde la carga, la anterior"""
+        return {self.category, getattr(self, '_original_category', None)} - {None}
+    
+    @staticmethod
+    def compute_price_per_unit(price, weight):
+        """Precio por kg (CLP/kg) o None si no hay peso"""
+        if price is None or not weight or weight <= 0:
+            return None
+        return round(float(price) * 1000 / weight, 2)
+    
+    @staticmethod
+    def compute_has_real_data(carbon_footprint, environmental_impact_score, green_score):
+        """True si hay algún dato real de impacto ambiental"""
+        return bool(carbon_footprint or environmental_impact_score or green_score)
+    
+    @staticmethod
+    def compute_data_quality(carbon_footprint, environmental_impact_score, green_score):
+        """'real_data', 'hybrid' o 'calculated' según los datos ambientales disponibles"""
+        if not Product.compute_has_real_data(carbon_footprint, environmental_impact_score, green_score):
+            return 'calculated'
+        if carbon_footprint and green_score:
+            return 'real_data'
+        return 'hybrid'
+    
+    @staticmethod
+    def compute_environmental_quality(carbon_footprint, environmental_impact_score, green_score, ecoscore):
+        """Categoría de calidad ambiental a partir de las columnas (sin instancia)"""
+        if not Product.compute_has_real_data(carbon_footprint, environmental_impact_score, green_score):
             return 'Desconocido'
         
         # Si tenemos Green Score (0-100, mayor = mejor)
-        if self.green_score:
-            if self.green_score >= 80:
+        if green_score:
+            if green_score >= 80:
                 return 'Excelente'
-            elif self.green_score >= 60:
+            elif green_score >= 60:
                 return 'Bueno'
-            elif self.green_score >= 40:
+            elif green_score >= 40:
                 return 'Medio'
-            elif self.green_score >= 20:
+            elif green_score >= 20:
                 return 'Bajo'
             else:
                 return 'Muy Bajo'
         
         # Si tenemos Eco-Score
-        if self.ecoscore:
+        if ecoscore:
             mapping = {'A': 'Excelente', 'B': 'Bueno', 'C': 'Medio', 'D': 'Bajo', 'E': 'Muy Bajo'}
-            return mapping.get(self.ecoscore, 'Desconocido')
+            return mapping.get(ecoscore, 'Desconocido')
         
         return 'Desconocido'
     
+    @staticmethod
+    def format_carbon_footprint(carbon_footprint):
+        """Huella de carbono formateada o None"""
+        if carbon_footprint:
+            return f"{carbon_footprint:.0f}g CO₂e/100g"
+        return None
+    
+    @property
+    def has_real_environmental_data(self):
+        """Verifica si tiene datos reales de impacto ambiental"""
+        return self.compute_has_real_data(
+            self.carbon_footprint,
+            self.environmental_impact_score,
+            self.green_score,
+        )
+    
+    @property
+    def environmental_quality(self):
+        """Retorna categoría de calidad ambiental basada en datos reales"""
+        return self.compute_environmental_quality(
+            self.carbon_footprint,
+            self.environmental_impact_score,
+            self.green_score,
+            self.ecoscore,
+        )
+    
     @property
     def carbon_footprint_display(self):
         """Retorna la huella de carbono formateada"""
-        if self.carbon_footprint:
-            return f"{self.carbon_footprint:.0f}g CO₂e/100g"
-        return None
\ No newline at end of file
+        return self.format_carbon_footprint(self.carbon_footprint)
\ No newline at end of file
@@ -1,7 +1,182 @@
-from django.db import models
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from api.models.product import Product
 
+
+# Listas cuyos deltas por item se omiten (ver ShoppingListManager.deferred_totals)
+_deferred_lists = ContextVar('deferred_shopping_lists', default=frozenset())
+
+# Totales mantenidos por ShoppingListManager (ShoppingList.save no los escribe)
+TOTAL_FIELDS = ('total_price', 'total_items', 'score_sum', 'score_count', 'average_score')
+
+# Reintentos de refresh() cuando otra transacción cambia la versión de la lista
+REFRESH_ATTEMPTS = 5
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class ShoppingListManager(models.Manager):
+    """
+    Mantenimiento incremental de los totales de las listas.
+    
+    Cada escritura de un item aplica deltas con F() en la misma transacción
+    (un UPDATE por lista, que también sube `version`); refresh() recalcula
+    desde los items con una sola consulta agregada y escribe con
+    compare-and-swap sobre `version`, así no pisa deltas concurrentes.
+    """
+    
+    def apply_delta(self, list_id, price=0, items=0, score_sum=0, score_count=0):
+        """Suma deltas a los totales de una lista y recalcula el promedio"""
+        new_sum = F('score_sum') + score_sum
+        new_count = F('score_count') + score_count
+        return self.filter(pk=list_id).update(
+            total_price=F('total_price') + _decimal(price),
+            total_items=F('total_items') + items,
+            score_sum=new_sum,
+            score_count=new_count,
+            average_score=Coalesce(
+                Cast(new_sum, FloatField()) / NullIf(new_count, 0),
+                Value(0.0),
+                output_field=FloatField(),
+            ),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+    
+    def touch(self, list_id):
+        """
+        Sube `version` y `updated_at` sin cambiar los totales (cambios de
+        items que no los alteran, p. ej. reemplazar un producto por otro
+        del mismo precio y score); invalida el ETag de la lista.
+        """
+        return self.filter(pk=list_id).update(version=F('version') + 1, updated_at=timezone.now())
+    
+    def compute_totals(self, list_ids=None):
+        """
+        Totales recalculados desde los items (una consulta agregada).
+        
+        Returns:
+            dict: {list_id: {campo: valor}}; las listas sin items no aparecen
+        """
+        items = ShoppingListItem.objects.order_by()
+        if list_ids is not None:
+            items = items.filter(shopping_list_id__in=list_ids)
+        rows = items.values('shopping_list_id').annotate(
+            total_price=Sum('subtotal'),
+            total_items=Sum('quantity'),
+            score_sum=Sum('score_at_addition'),
+            score_count=Count('score_at_addition'),
+        )
+        return {
+            row['shopping_list_id']: {
+                'total_price': row['total_price'],
+                'total_items': row['total_items'],
+                'score_sum': row['score_sum'] or 0,
+                'score_count': row['score_count'],
+                'average_score': (row['score_sum'] or 0) / row['score_count'] if row['score_count'] else 0,
+            }
+            for row in rows
+        }
+    
+    def refresh(self, list_ids=None, dry_run=False):
+        """
+        Compara los totales guardados con los recalculados y corrige los
+        que no coinciden.
+        
+        Cada lista se escribe solo si su versión no cambió desde la lectura;
+        si cambió (un delta concurrente), se vuelve a calcular.
+        
+        Args:
+            dry_run: solo reportar, sin escribir
+        
+        Returns:
+            list: ids de las listas con totales desfasados
+        """
+        empty = {'total_price': Decimal('0'), 'total_items': 0, 'score_sum': 0, 'score_count': 0, 'average_score': 0}
+        stale = set()
+        pending = list_ids
+        
+        for _ in range(REFRESH_ATTEMPTS):
+            conflicts = []
+            with transaction.atomic(using=self.db):
+                lists = self.order_by('id')
+                if pending is not None:
+                    lists = lists.filter(id__in=pending)
+                # Versiones antes de agregar: un delta confirmado entre ambas
+                # lecturas hace fallar el compare-and-swap
+                current = list(lists.only('id', 'version', *TOTAL_FIELDS))
+                computed = self.compute_totals(pending)
+                
+                for shopping_list in current:
+                    expected = computed.get(shopping_list.id, empty)
+                    if shopping_list.totals_match(expected):
+                        continue
+                    stale.add(shopping_list.id)
+                    if dry_run:
+                        continue
+                    swapped = self.filter(pk=shopping_list.id, version=shopping_list.version).update(
+                        **expected,
+                        version=F('version') + 1,
+                        updated_at=timezone.now(),
+                    )
+                    if not swapped:
+                        conflicts.append(shopping_list.id)
+            if not conflicts:
+                break
+            pending = conflicts
+        return sorted(stale)
+    
+    @contextmanager
+    def deferred_totals(self, list_id):
+        """
+        Transacción para escrituras masivas de items de una lista: omite los
+        deltas por item y recalcula los totales una sola vez al final.
+        """
+        token = _deferred_lists.set(_deferred_lists.get() | {list_id})
+        try:
+            with transaction.atomic(using=self.db):
+                yield
+                self.refresh([list_id])
+        finally:
+            _deferred_lists.reset(token)
+    
+    # --- Escrituras de items (llamadas desde api/signals.py) ---
+    
+    def item_saved(self, item, created):
+        original = getattr(item, '_original_totals', None)
+        if item.shopping_list_id in _deferred_lists.get():
+            return
+        if created:
+            self.apply_delta(item.shopping_list_id, **item.totals_delta())
+        elif original is None or original['shopping_list_id'] != item.shopping_list_id:
+            self.refresh({item.shopping_list_id, original and original['shopping_list_id']} - {None})
+        else:
+            current = item.totals_delta()
+            self.apply_delta(
+                item.shopping_list_id,
+                **{field: current[field] - original[field] for field in current}
+            )
+    
+    def item_deleted(self, item):
+        original = getattr(item, '_original_totals', None) or dict(
+            item.totals_delta(), shopping_list_id=item.shopping_list_id
+        )
+        if original['shopping_list_id'] in _deferred_lists.get():
+            return
+        self.apply_delta(
+            original['shopping_list_id'],
+            **{field: -value for field, value in original.items() if field != 'shopping_list_id'}
+        )
+
+
 class ShoppingList(models.Model):
     """Listas de compras del usuario"""
     
@@ -9,20 +184,111 @@ class ShoppingList(models.Model):
     budget = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     is_optimized = models.BooleanField(default=False)
     
-    # Totales calculados
+    # Totales calculados (mantenidos con deltas por ShoppingListManager)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_items = models.IntegerField(default=0)
     average_score = models.FloatField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_count = models.IntegerField(default=0)
+    # Sube con cada cambio de totales (compare-and-swap en refresh)
+    version = models.PositiveIntegerField(default=0)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ShoppingListManager()
+    
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.name} - ${self.total_price}"
+    
+    def save(self, *args, **kwargs):
+        """
+        Las filas existentes no reescriben los totales: solo los cambian
+        los deltas y refresh(), con UPDATE atómicos.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (*TOTAL_FIELDS, 'version')
+            ]
+        super().save(*args, **kwargs)
+    
+    def totals_match(self, expected):
+        """Compara los totales guardados con los esperados (scores con tolerancia)"""
+        return (
+            _decimal(self.total_price) == _decimal(expected['total_price'])
+            and self.total_items == expected['total_items']
+            and self.score_count == expected['score_count']
+            and abs(self.score_sum - expected['score_sum']) < 1e-6
+            and abs(self.average_score - expected['average_score']) < 1e-6
+        )
+
+
+class ShoppingListItemManager(models.Manager):
+    
+    def add_quantity(self, list_id, product, quantity):
+        """
+        Suma `quantity` al item del producto en la lista, o lo crea.
+        
+        Seguro ante llamadas concurrentes: el incremento es un UPDATE con
+        F('quantity') + n y, si dos llamadas crean el item a la vez, la que
+        choca con unique_together suma sobre el item de la otra.
+        
+        Returns:
+            tuple: (item, created)
+        """
+        with transaction.atomic(using=self.db):
+            if not self._increment(list_id, product.pk, quantity):
+                try:
+                    with transaction.atomic(using=self.db):
+                        # post_save aplica el delta a los totales
+                        return self.create(
+                            shopping_list_id=list_id,
+                            product=product,
+                            quantity=quantity,
+                            price_at_addition=product.price,
+                            score_at_addition=self.model.product_score(product),
+                        ), True
+                except IntegrityError:
+                    self._increment(list_id, product.pk, quantity)
+            
+            item = self.get(shopping_list_id=list_id, product_id=product.pk)
+            item.product = product
+            ShoppingList.objects.apply_delta(list_id, price=item.price_at_addition * quantity, items=quantity)
+            return item, False
+    
+    def increment_many(self, list_id, quantities):
+        """
+        Suma cantidades a varios items existentes con un solo UPDATE
+        (F('quantity') + n por producto); no toca los totales de la lista.
+        
+        Args:
+            quantities: {product_id: cantidad a sumar}
+        
+        Returns:
+            int: items actualizados
+        """
+        if not quantities:
+            return 0
+        delta = Case(
+            *(When(product_id=pid, then=Value(quantity)) for pid, quantity in quantities.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        return self.filter(shopping_list_id=list_id, product_id__in=list(quantities)).update(
+            quantity=F('quantity') + delta,
+            subtotal=F('price_at_addition') * (F('quantity') + delta),
+        )
+    
+    def _increment(self, list_id, product_id, quantity):
+        return self.filter(shopping_list_id=list_id, product_id=product_id).update(
+            quantity=F('quantity') + quantity,
+            subtotal=F('price_at_addition') * (F('quantity') + quantity),
+        )
 
 
 class ShoppingListItem(models.Model):
@@ -39,6 +305,9 @@ class ShoppingListItem(models.Model):
     # Información al momento de agregar
     price_at_addition = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    score_at_addition = models.FloatField(null=True, blank=True)
+    
+    objects = ShoppingListItemManager()
     
     class Meta:
         unique_together = ['shopping_list', 'product']
@@ -46,7 +315,45 @@ class ShoppingListItem(models.Model):
     def __str__(self):
         return f"{self.product.name} x{self.quantity}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Aporte original a los totales, para aplicar deltas a la lista
+        instance._original_totals = instance._current_totals()
+        return instance
+    
+    @staticmethod
+    def product_score(product):
+        """total_score actual del producto, o None si no tiene score"""
+        sustainability = getattr(product, 'sustainability', None)
+        return sustainability.total_score if sustainability is not None else None
+    
+    def totals_delta(self):
+        """Aporte de este item a los totales de su lista"""
+        return {
+            'price': _decimal(self.subtotal),
+            'items': self.quantity,
+            'score_sum': self.score_at_addition or 0,
+            'score_count': 0 if self.score_at_addition is None else 1,
+        }
+    
+    def _current_totals(self):
+        """totals_delta() + lista, o None si algún campo no está cargado"""
+        loaded = ('shopping_list_id', 'quantity', 'subtotal', 'score_at_addition')
+        if any(field not in self.__dict__ for field in loaded):
+            return None
+        return dict(self.totals_delta(), shopping_list_id=self.shopping_list_id)
+    
     def save(self, *args, **kwargs):
-        """Calcular subtotal automáticamente"""
+        """
+        Calcular subtotal automáticamente.
+        
+        Es atómico para que los totales de la lista (post_save) se
+        actualicen en la misma transacción.
+        """
         self.subtotal = self.price_at_addition * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self._state.adding and self.score_at_addition is None:
+            self.score_at_addition = self.product_score(self.product)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._original_totals = self._current_totals()
@@ -0,0 +1,222 @@
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Min, Subquery, Sum
+from django.utils import timezone
+
+
+# Sumas de SustainabilityScore que se mantienen por categoría
+SCORE_FIELDS = ('total_score', 'economic_score', 'environmental_score', 'social_score')
+SCORE_SUM_FIELDS = tuple(f'{field}_sum' for field in SCORE_FIELDS)
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class CategoryStatsManager(models.Manager):
+    """
+    Mantenimiento incremental de las estadísticas por categoría.
+
+    Las escrituras de una fila aplican deltas con F() en la misma
+    transacción; min/max de precio se recalculan con una subconsulta sobre
+    el índice (category, price). Las escrituras masivas recalculan las
+    categorías afectadas con consultas agrupadas.
+    """
+
+    def _price_bound(self, category, ordering):
+        from api.models.product import Product
+        return Subquery(
+            Product.objects
+            .filter(category=category)
+            .order_by(ordering)
+            .values('price')[:1]
+        )
+
+    def apply_delta(self, category, product_count=0, price_sum=0, prices_changed=False,
+                    score_count=0, score_sums=None):
+        """
+        Suma deltas a la fila de una categoría (la crea si no existe).
+
+        Args:
+            prices_changed: recalcular min/max de precio de la categoría
+            score_sums: dict {campo de SCORE_FIELDS: delta}
+        """
+        updates = {'updated_at': timezone.now()}
+        if product_count:
+            updates['product_count'] = F('product_count') + product_count
+        if price_sum:
+            updates['price_sum'] = F('price_sum') + _decimal(price_sum)
+        if prices_changed:
+            updates['price_min'] = self._price_bound(category, 'price')
+            updates['price_max'] = self._price_bound(category, '-price')
+        if score_count:
+            updates['score_count'] = F('score_count') + score_count
+        for field, delta in (score_sums or {}).items():
+            if delta:
+                updates[f'{field}_sum'] = F(f'{field}_sum') + delta
+
+        if len(updates) == 1:
+            return
+
+        with transaction.atomic(using=self.db):
+            if self.filter(category=category).update(**updates):
+                return
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(category=category)
+            except IntegrityError:
+                # Otra transacción la creó entre medio
+                pass
+            self.filter(category=category).update(**updates)
+
+    def refresh(self, categories=None):
+        """
+        Recalcula desde cero las categorías indicadas (o todas) con una
+        consulta agrupada sobre Product y otra sobre SustainabilityScore.
+
+        Returns:
+            int: Número de categorías con productos
+        """
+        from api.models.product import Product
+        from api.models.sustainability import SustainabilityScore
+
+        products = Product.objects.order_by()
+        scores = SustainabilityScore.objects.order_by()
+        if categories is not None:
+            categories = set(categories) - {None}
+            if not categories:
+                return 0
+            products = products.filter(category__in=categories)
+            scores = scores.filter(product__category__in=categories)
+
+        rows = {
+            row['category']: self.model(
+                category=row['category'],
+                product_count=row['count'],
+                price_sum=row['price_sum'] or 0,
+                price_min=row['price_min'],
+                price_max=row['price_max'],
+            )
+            for row in products.values('category').annotate(
+                count=Count('id'),
+                price_sum=Sum('price'),
+                price_min=Min('price'),
+                price_max=Max('price'),
+            )
+        }
+        score_rows = scores.values('product__category').annotate(
+            count=Count('id'),
+            **{f'{field}_sum': Sum(field) for field in SCORE_FIELDS}
+        )
+        for row in score_rows:
+            stats = rows.get(row['product__category'])
+            if stats is None:
+                continue
+            stats.score_count = row['count']
+            for field in SCORE_SUM_FIELDS:
+                setattr(stats, field, row[field] or 0)
+
+        now = timezone.now()
+        for stats in rows.values():
+            stats.updated_at = now
+
+        with transaction.atomic(using=self.db):
+            stale = self.exclude(category__in=list(rows))
+            if categories is not None:
+                stale = stale.filter(category__in=categories)
+            stale.delete()
+            self.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=['category'],
+                update_fields=[
+                    'product_count', 'price_sum', 'price_min', 'price_max',
+                    'score_count', *SCORE_SUM_FIELDS, 'updated_at',
+                ],
+            )
+        return len(rows)
+
+    # --- Escrituras de una fila (llamadas desde api/signals.py) ---
+
+    def product_saved(self, product, created):
+        original_price = getattr(product, '_original_price', None)
+        original_category = getattr(product, '_original_category', None)
+
+        if created:
+            self.apply_delta(product.category, product_count=1, price_sum=product.price, prices_changed=True)
+        elif original_price is None or original_category != product.category:
+            # Sin valores originales o con cambio de categoría (los scores
+            # también se mueven): se recalculan las categorías afectadas
+            self.refresh(product.affected_categories)
+        elif _decimal(original_price) != _decimal(product.price):
+            self.apply_delta(
+                product.category,
+                price_sum=_decimal(product.price) - _decimal(original_price),
+                prices_changed=True,
+            )
+
+    def product_deleted(self, product):
+        self.apply_delta(product.category, product_count=-1, price_sum=-_decimal(product.price), prices_changed=True)
+
+    def score_saved(self, score, created, category):
+        original = getattr(score, '_original_scores', None)
+        if created:
+            self.apply_delta(
+                category,
+                score_count=1,
+                score_sums={field: getattr(score, field) for field in SCORE_FIELDS},
+            )
+        elif original is None:
+            self.refresh([category])
+        else:
+            self.apply_delta(
+                category,
+                score_sums={
+                    field: getattr(score, field) - original[field]
+                    for field in SCORE_FIELDS
+                },
+            )
+
+    def score_deleted(self, score, category):
+        original = getattr(score, '_original_scores', None) or {
+            field: getattr(score, field) for field in SCORE_FIELDS
+        }
+        self.apply_delta(
+            category,
+            score_count=-1,
+            score_sums={field: -original[field] for field in SCORE_FIELDS},
+        )
+
+
+class CategoryStats(models.Model):
+    """
+    Estadísticas materializadas del catálogo por categoría.
+
+    Las globales se obtienen sumando las filas (una por categoría), así el
+    resumen se lee en O(categorías) en vez de recorrer las tablas.
+    """
+
+    category = models.CharField(max_length=100, primary_key=True)
+
+    product_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Sumas de SustainabilityScore (solo productos con score)
+    score_count = models.IntegerField(default=0)
+    total_score_sum = models.FloatField(default=0)
+    economic_score_sum = models.FloatField(default=0)
+    environmental_score_sum = models.FloatField(default=0)
+    social_score_sum = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CategoryStatsManager()
+
+    class Meta:
+        verbose_name = 'Estadísticas de categoría'
+        verbose_name_plural = 'Estadísticas por categoría'
+
+    def __str__(self):
+        return f"{self.category}: {self.product_count} productos"
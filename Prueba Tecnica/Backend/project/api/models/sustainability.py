@@ -1,6 +1,57 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
 from django.core.validators import MinValueValidator, MaxValueValidator
 from api.models.product import Product
+from api.models.stats import CategoryStats, SCORE_FIELDS
+
+
+class SustainabilityScoreQuerySet(models.QuerySet):
+    """
+    Las escrituras masivas resincronizan Product.sustainability_score, lo que
+    a su vez incrementa la versión del catálogo en la misma transacción, y
+    recalculan CategoryStats de las categorías afectadas.
+    """
+    
+    def _sync_products(self, product_ids):
+        Product.objects.filter(pk__in=product_ids).update(
+            sustainability_score=Subquery(
+                self.model.objects.filter(product_id=OuterRef('pk')).values('total_score')[:1]
+            )
+        )
+        CategoryStats.objects.refresh(
+            Product.objects.filter(pk__in=product_ids).order_by().values_list('category', flat=True).distinct()
+        )
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            self._sync_products({obj.product_id for obj in objs})
+        return created
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            self._sync_products({obj.product_id for obj in objs})
+        return rows
+    
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            product_ids = list(self.values_list('product_id', flat=True))
+            rows = super().update(**kwargs)
+            if rows:
+                self._sync_products(product_ids)
+        return rows
+    
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            product_ids = list(self.values_list('product_id', flat=True))
+            deleted = super().delete()
+            if product_ids:
+                self._sync_products(product_ids)
+        return deleted
+
 
 class SustainabilityScore(models.Model):
     """Puntuaciones de sostenibilidad calculadas para cada producto"""
@@ -30,9 +81,45 @@ class SustainabilityScore(models.Model):
     # Metadata
     calculated_at = models.DateTimeField(auto_now=True)
     
+    objects = SustainabilityScoreQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Sustainability Score'
         verbose_name_plural = 'Sustainability Scores'
     
     def __str__(self):
-        return f"{self.product.name} - Score: {self.total_score:.2f}"
\ No newline at end of file
+        return f"{self.product.name} - Score: {self.total_score:.2f}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores originales, para aplicar deltas a CategoryStats
+        instance._original_scores = instance._current_scores()
+        return instance
+    
+    def _current_scores(self):
+        """{campo: valor} de los scores, o None si alguno no está cargado"""
+        if any(field not in self.__dict__ for field in SCORE_FIELDS):
+            return None
+        return {field: self.__dict__[field] for field in SCORE_FIELDS}
+    
+    def save(self, *args, **kwargs):
+        """Sincroniza el score total desnormalizado en Product"""
+        # Se sincroniza antes de guardar para que los receptores de post_save
+        # ya vean el valor nuevo en Product
+        with transaction.atomic():
+            self._sync_product_score(self.total_score)
+            super().save(*args, **kwargs)
+        self._original_scores = self._current_scores()
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._sync_product_score(None)
+            return super().delete(*args, **kwargs)
+    
+    def _sync_product_score(self, value):
+        # ProductQuerySet.update actualiza updated_at e incrementa la
+        # versión del catálogo
+        Product.objects.filter(pk=self.product_id).update(sustainability_score=value)
+        if self._meta.get_field('product').is_cached(self):
+            self.product.sustainability_score = value
\ No newline at end of file
@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ProductTombstone(models.Model):
+    """
+    Registro de un producto eliminado, para la sincronización incremental
+    (GET /api/products/changes/). Se crea desde la señal post_delete.
+    """
+    
+    product_id = models.BigIntegerField(primary_key=True)
+    barcode = models.CharField(max_length=50)
+    category = models.CharField(max_length=100)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Producto eliminado'
+        verbose_name_plural = 'Productos eliminados'
+        indexes = [
+            models.Index(fields=['deleted_at', 'product_id'], name='tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.barcode} (eliminado {self.deleted_at:%Y-%m-%d %H:%M})"
+    
+    @classmethod
+    def record(cls, product):
+        """Registra (o actualiza) el borrado de un producto"""
+        cls.objects.update_or_create(
+            product_id=product.pk,
+            defaults={
+                'barcode': product.barcode,
+                'category': product.category,
+                'deleted_at': timezone.now(),
+            }
+        )
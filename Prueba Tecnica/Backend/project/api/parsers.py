@@ -0,0 +1,38 @@
+"""
+Parser JSON con orjson (si está instalado)
+
+Solo se usa para cuerpos UTF-8; ante cualquier error (JSON inválido,
+otra codificación) se delega en el JSONParser de DRF, que genera el mismo
+ParseError de siempre.
+
+Diferencia conocida: orjson lee los enteros de más de 64 bits como float.
+"""
+
+import codecs
+import io
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from api.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser que usa orjson cuando está disponible"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+
+        if codecs.lookup(encoding).name == 'utf-8':
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,59 @@
+"""
+Renderer JSON con orjson (si está instalado)
+
+Genera el mismo JSON que rest_framework.renderers.JSONRenderer: compacto,
+UTF-8, U+2028/U+2029 escapados, y Decimal/datetime/Promise/numpy pasan por
+el encoder de DRF (Decimal -> float, datetime -> ISO 8601 con 'Z'). Sin
+orjson, o si se pide indentación, se usa el renderer de DRF.
+
+Diferencias conocidas:
+- orjson escribe los floats muy grandes o muy chicos sin notación
+  '+'/exponente ('1e16' en vez de '1e+16', '0.00001' en vez de '1e-05');
+  el valor es el mismo.
+- NaN e Infinity se escriben como null. El renderer de DRF (STRICT_JSON)
+  lanza ValueError y la respuesta termina en 500; detectarlos obligaría a
+  recorrer los datos antes de serializar.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+# Tipos que orjson no serializa igual que DRF se delegan a su encoder
+_drf_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer que usa orjson cuando está disponible"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_drf_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # p.ej. enteros de más de 64 bits: el encoder estándar sí los acepta
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
@@ -1,6 +1,10 @@
 from .product_serializer import ProductSerializer, ProductListSerializer
 from .sustainability_serializer import SustainabilityScoreSerializer
-from .shopping_serializer import ShoppingListSerializer, ShoppingListItemSerializer
+from .shopping_serializer import (
+    ShoppingListSerializer,
+    ShoppingListItemSerializer,
+    ShoppingListSummarySerializer,
+)
 
 __all__ = [
     'ProductSerializer',
@@ -8,4 +12,5 @@ __all__ = [
     'SustainabilityScoreSerializer',
     'ShoppingListSerializer',
     'ShoppingListItemSerializer',
+    'ShoppingListSummarySerializer',
 ]
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Serialización rápida de listados de productos
+
+Lee filas con .values_list() (score incluido vía LEFT JOIN) y arma los
+dicts directamente, sin instanciar modelos ni pasar por los campos de DRF.
+La salida es idéntica a la de ProductListSerializer, incluidos ?fields= y
+?exclude=.
+"""
+
+from operator import itemgetter
+from typing import Dict, List
+from api.models.product import Product
+from api.serializers.product_serializer import (
+    ProductListSerializer,
+    QUALITY_COLUMNS,
+    REAL_DATA_COLUMNS,
+)
+
+
+# Columnas de .values_list() que necesita cada campo calculado
+FIELD_COLUMNS = {
+    'sustainability_score': ['sustainability__total_score'],
+    'carbon_footprint_display': ['carbon_footprint'],
+    'environmental_quality': QUALITY_COLUMNS,
+    'has_real_data': REAL_DATA_COLUMNS,
+}
+
+
+class FastProductListSerializer:
+    """
+    Equivalente de ProductListSerializer(many=True) sobre filas crudas.
+
+    Uso:
+        fast = FastProductListSerializer(fields=[...], exclude=[...])
+        rows = fast.prepare(queryset)      # QuerySet de tuplas
+        data = fast.serialize(rows[:20])
+    """
+
+    def __init__(self, fields=None, exclude=None):
+        self.field_names = ProductListSerializer.selected_field_names(fields, exclude)
+
+        columns = []
+        for name in self.field_names:
+            for column in FIELD_COLUMNS.get(name, [name]):
+                if column not in columns:
+                    columns.append(column)
+        self.columns = columns
+        self._builders = [(name, self._builder(name)) for name in self.field_names]
+
+    def _builder(self, name):
+        index = self.columns.index
+
+        if name == 'price':
+            # Mismo formato que el DecimalField de DRF (string con 2 decimales)
+            field = ProductListSerializer().fields['price']
+            get = itemgetter(index('price'))
+            return lambda row: None if get(row) is None else field.to_representation(get(row))
+
+        if name == 'price_per_unit':
+            get = itemgetter(index('price_per_unit'))
+            return lambda row: None if get(row) is None else float(get(row))
+
+        if name == 'sustainability_score':
+            return itemgetter(index('sustainability__total_score'))
+
+        if name == 'carbon_footprint_display':
+            get = itemgetter(index('carbon_footprint'))
+            return lambda row: Product.format_carbon_footprint(get(row))
+
+        if name == 'environmental_quality':
+            get = itemgetter(*[index(column) for column in QUALITY_COLUMNS])
+            return lambda row: Product.compute_environmental_quality(*get(row))
+
+        if name == 'has_real_data':
+            get = itemgetter(*[index(column) for column in REAL_DATA_COLUMNS])
+            return lambda row: Product.compute_has_real_data(*get(row))
+
+        return itemgetter(index(name))
+
+    def prepare(self, queryset):
+        """QuerySet de tuplas con las columnas necesarias (un solo SELECT)"""
+        return queryset.select_related(None).values_list(*self.columns)
+
+    def serialize(self, rows) -> List[Dict]:
+        builders = self._builders
+        return [{name: build(row) for name, build in builders} for row in rows]
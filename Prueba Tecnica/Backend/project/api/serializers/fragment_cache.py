@@ -0,0 +1,103 @@
+"""
+Caché de fragmentos serializados por producto
+
+Guarda el dict ya serializado de cada producto, con clave por serializer,
+campos emitidos, id, updated_at y calculated_at del score. Los listados se
+arman desde los fragmentos y solo se serializan los productos que cambiaron.
+"""
+
+import hashlib
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from rest_framework import serializers
+
+
+class FragmentStats:
+    """Contadores de aciertos del proceso actual"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else None,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+fragment_stats = FragmentStats()
+
+
+def get_fragment_cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else ''
+
+
+class FragmentCachedListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer que reutiliza fragmentos cacheados de cada elemento.
+
+    Los elementos sin updated_at cargado (p.ej. por .only()) se serializan
+    sin caché.
+    """
+
+    def _fragment_prefix(self):
+        fields = ','.join(self.child.fields)
+        digest = hashlib.md5(fields.encode()).hexdigest()[:12]
+        return f'fragment:{type(self.child).__name__}:{digest}'
+
+    def _fragment_key(self, prefix, item):
+        if 'updated_at' in item.get_deferred_fields():
+            return None
+        score = item._state.fields_cache.get('sustainability')
+        score_version = _timestamp(score.calculated_at) if score is not None else ''
+        return f'{prefix}:{item.pk}:{_timestamp(item.updated_at)}:{score_version}'
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        if not items:
+            return []
+
+        cache = get_fragment_cache()
+        prefix = self._fragment_prefix()
+        keys = [self._fragment_key(prefix, item) for item in items]
+        cached = cache.get_many([key for key in keys if key is not None])
+
+        result = []
+        fresh = {}
+        misses = 0
+        for key, item in zip(keys, items):
+            if key is not None and key in cached:
+                result.append(cached[key])
+                continue
+            representation = self.child.to_representation(item)
+            misses += 1
+            if key is not None:
+                fresh[key] = representation
+            result.append(representation)
+
+        if fresh:
+            cache.set_many(fresh, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+        # Los elementos sin clave (no cacheables) cuentan como fallos
+        fragment_stats.record(hits=len(items) - misses, misses=misses)
+        return result
@@ -1,8 +1,15 @@
 from rest_framework import serializers
 from api.models.product import Product
 from api.serializers.sustainability_serializer import SustainabilityScoreSerializer
+from api.serializers.sparse_fields import SparseFieldsMixin
+from api.serializers.fragment_cache import FragmentCachedListSerializer
 
-class ProductSerializer(serializers.ModelSerializer):
+# Columnas que leen las propiedades ambientales de Product
+REAL_DATA_COLUMNS = ['carbon_footprint', 'environmental_impact_score', 'green_score']
+QUALITY_COLUMNS = REAL_DATA_COLUMNS + ['ecoscore']
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer completo con todos los datos reales"""
     
     sustainability = SustainabilityScoreSerializer(read_only=True)
@@ -27,6 +34,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'price',
             'weight',
             'unit',
+            'price_per_unit',
             
             # Scores oficiales
             'nutriscore',
@@ -62,6 +70,17 @@ class ProductSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+        # Columnas que necesita cada campo calculado (para .only())
+        field_sources = {
+            'carbon_footprint_display': ['carbon_footprint'],
+            'environmental_quality': QUALITY_COLUMNS,
+            'has_real_data': REAL_DATA_COLUMNS,
+            'sustainability': ['sustainability'] + REAL_DATA_COLUMNS,
+            'environmental_data': QUALITY_COLUMNS + ['data_source', 'has_ecoscore_data'],
+        }
+        # updated_at se carga siempre: es parte de la clave de fragmentos
+        key_columns = ['id', 'updated_at']
+        list_serializer_class = FragmentCachedListSerializer
     
     def get_environmental_data(self, obj):
         """
@@ -109,15 +128,15 @@ class ProductSerializer(serializers.ModelSerializer):
                 'description': 'Puntuación de impacto ambiental del ciclo de vida completo'
             }
         
-        # Si tenemos el JSON completo de ecoscore
-        if obj.ecoscore_data:
+        # Si tenemos el JSON completo de ecoscore (tabla aparte)
+        if obj.has_ecoscore_data:
             data['detailed_data_available'] = True
             data['ecoscore_details_url'] = f'/api/products/{obj.id}/ecoscore-details/'
         
         return data
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer ligero para listados"""
     
     sustainability_score = serializers.SerializerMethodField()
@@ -136,6 +155,7 @@ class ProductListSerializer(serializers.ModelSerializer):
             'brand',
             'category',
             'price',
+            'price_per_unit',
             'image_url',
             'nutriscore',
             'ecoscore',
@@ -146,15 +166,26 @@ class ProductListSerializer(serializers.ModelSerializer):
             'environmental_quality',
             'has_real_data',
         ]
+        field_sources = {
+            'sustainability_score': ['sustainability'],
+            'carbon_footprint_display': ['carbon_footprint'],
+            'environmental_quality': QUALITY_COLUMNS,
+            'has_real_data': REAL_DATA_COLUMNS,
+        }
+        key_columns = ['id', 'updated_at']
+        list_serializer_class = FragmentCachedListSerializer
     
     def get_sustainability_score(self, obj):
         if hasattr(obj, 'sustainability'):
             return obj.sustainability.total_score
         return None
     
-class ProductDetailedEnvironmentalSerializer(serializers.ModelSerializer):
+class ProductDetailedEnvironmentalSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer SOLO para datos ambientales detallados"""
     
+    # JSON completo, leído desde ProductEcoscoreData (None si no existe)
+    ecoscore_data = serializers.JSONField(source='ecoscore_details.data', read_only=True)
+    
     class Meta:
         model = Product
         fields = [
@@ -184,6 +215,11 @@ class EnrichedProductSerializer(ProductSerializer):
             'category_average',
             'carbon_comparison',
         ]
+        field_sources = {
+            **ProductSerializer.Meta.field_sources,
+            'category_average': ['category', 'sustainability'],
+            'carbon_comparison': ['category', 'carbon_footprint'],
+        }
     
     def get_category_average(self, obj):
         """Score promedio de la categoría"""
@@ -36,4 +36,23 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['total_price', 'total_items', 'average_score']
\ No newline at end of file
+        read_only_fields = ['total_price', 'total_items', 'average_score']
+
+
+class ShoppingListSummarySerializer(serializers.ModelSerializer):
+    """Lista sin items: solo totales, para listados y el dashboard"""
+    
+    class Meta:
+        model = ShoppingList
+        fields = [
+            'id',
+            'name',
+            'budget',
+            'is_optimized',
+            'total_price',
+            'total_items',
+            'average_score',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,68 @@
+from rest_framework import serializers
+
+
+def parse_field_list(value):
+    """'a, b,,c' -> ['a', 'b', 'c']"""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Permite elegir los campos de la respuesta con ?fields=a,b o ?exclude=c.
+
+    También se pueden pasar como kwargs: Serializer(obj, fields=[...]).
+
+    Meta.field_sources indica qué columnas del modelo necesita cada campo
+    (por defecto, la columna del mismo nombre). Con required_columns() la
+    vista puede llamar a .only() y no leer columnas que no se van a emitir.
+    Meta.key_columns se cargan siempre (por defecto solo 'id').
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None and exclude is None:
+            request = self.context.get('request')
+            if request is not None:
+                fields = parse_field_list(request.query_params.get('fields'))
+                exclude = parse_field_list(request.query_params.get('exclude'))
+
+        if fields is None and exclude is None:
+            return
+
+        selected = set(self.selected_field_names(fields, exclude))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_field_names(cls, fields=None, exclude=None):
+        """Campos a emitir; lanza ValidationError si se pide uno inexistente"""
+        available = list(cls.Meta.fields)
+        unknown = [name for name in (fields or []) + (exclude or []) if name not in available]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f'Campos desconocidos: {", ".join(unknown)}'
+            })
+
+        selected = [name for name in available if fields is None or name in fields]
+        return [name for name in selected if name not in (exclude or [])]
+
+    @classmethod
+    def required_columns(cls, fields=None, exclude=None):
+        """
+        Columnas del modelo necesarias para los campos seleccionados.
+
+        Returns:
+            set: nombres para .only(); las relaciones aparecen con su nombre
+            (p.ej. 'sustainability')
+        """
+        sources = getattr(cls.Meta, 'field_sources', {})
+        columns = set(getattr(cls.Meta, 'key_columns', ['id']))
+        for name in cls.selected_field_names(fields, exclude):
+            columns.update(sources.get(name, [name]))
+        return columns
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from api.models.sustainability import SustainabilityScore
+from api.models.product import Product
 
 class SustainabilityScoreSerializer(serializers.ModelSerializer):
     """Serializer para scores de sostenibilidad CON detalles"""
@@ -42,12 +43,11 @@ class SustainabilityScoreSerializer(serializers.ModelSerializer):
     def get_data_quality(self, obj):
         """Indica si los datos son reales o calculados"""
         product = obj.product
-        if product.has_real_environmental_data:
-            if product.carbon_footprint and product.green_score:
-                return 'real_data'
-            else:
-                return 'hybrid'
-        return 'calculated'
+        return Product.compute_data_quality(
+            product.carbon_footprint,
+            product.environmental_impact_score,
+            product.green_score,
+        )
     
     def _get_category(self, score):
         if score >= 80:
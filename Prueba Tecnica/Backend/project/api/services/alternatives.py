@@ -0,0 +1,297 @@
+"""
+Alternativas precalculadas de productos
+
+Mantiene la tabla ProductAlternative con las top-K alternativas de cada
+producto (misma categoría, hasta 120% del precio, mejor score) y la
+reconstruye por categoría con una sola consulta con ROW_NUMBER(). Un
+cambio en un solo producto reconstruye solo las filas que puede afectar.
+"""
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterable, List, Set
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from api.models.product import Product
+from api.models.alternative import ProductAlternative
+from api.services.catalog_version import bump_catalog_version
+
+
+ALTERNATIVES_TOP_K = 5
+MAX_PRICE_RATIO = 1.2
+
+_deferred = threading.local()
+
+
+def _ranked_sql(where: str) -> str:
+    """
+    SELECT (product_id, alternative_id, position) con ROW_NUMBER() por producto.
+
+    La ventana se particiona por producto de origen y no por categoría: el
+    join ya limita los candidatos a su categoría (y a su rango de precio,
+    que es distinto para cada origen), así que cada partición es la
+    categoría vista desde ese producto. Sigue siendo una sola consulta
+    para cualquier cantidad de productos.
+
+    Args:
+        where: condición sobre el producto de origen (alias p)
+    """
+    qn = connection.ops.quote_name
+    products = qn(Product._meta.db_table)
+    return f"""
+        SELECT product_id, alternative_id, position FROM (
+            SELECT
+                p.{qn('id')} AS product_id,
+                a.{qn('id')} AS alternative_id,
+                ROW_NUMBER() OVER (
+                    PARTITION BY p.{qn('id')}
+                    ORDER BY
+                        CASE WHEN a.{qn('sustainability_score')} IS NULL THEN 1 ELSE 0 END,
+                        a.{qn('sustainability_score')} DESC,
+                        a.{qn('id')}
+                ) AS position
+            FROM {products} p
+            JOIN {products} a
+                ON a.{qn('category')} = p.{qn('category')}
+                AND a.{qn('id')} <> p.{qn('id')}
+                AND a.{qn('price')} <= p.{qn('price')} * %s
+            WHERE {where}
+        ) ranked
+        WHERE position <= %s
+    """
+
+
+def _insert_sql(where: str) -> str:
+    """INSERT ... SELECT con ranking por ventana para los productos de origen dados"""
+    qn = connection.ops.quote_name
+    alternatives = qn(ProductAlternative._meta.db_table)
+    return f"""
+        INSERT INTO {alternatives} ({qn('product_id')}, {qn('alternative_id')}, {qn('position')})
+        {_ranked_sql(where)}
+    """
+
+
+def _rebuild_sql(num_categories: int) -> str:
+    """INSERT ... SELECT para todos los productos de las categorías dadas"""
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * num_categories)
+    return _insert_sql(f"p.{qn('category')} IN ({placeholders})")
+
+
+def _rank_key(score, pk):
+    """Clave de orden de _ranked_sql: score (NULL al final) desc, id asc"""
+    return (score is None, -(score or 0), pk)
+
+
+def rebuild_alternatives(categories: Iterable[str] = None) -> int:
+    """
+    Reconstruye las alternativas de las categorías indicadas (o de todas).
+
+    Si un producto cambió de categoría, también se reconstruyen las
+    categorías que aún lo tenían como alternativa.
+
+    Al terminar sube la versión de esas categorías: la escritura que
+    provocó la reconstrucción ya la subió al confirmarse, pero una lectura
+    entre ese commit y esta reconstrucción pudo cachear las alternativas
+    viejas con la versión nueva.
+
+    Returns:
+        int: Número de filas insertadas
+    """
+    if categories is None:
+        categories = set(Product.objects.values_list('category', flat=True).distinct())
+    else:
+        categories = set(categories)
+        categories |= set(
+            ProductAlternative.objects
+            .filter(alternative__category__in=categories)
+            .values_list('product__category', flat=True)
+            .distinct()
+        )
+
+    if not categories:
+        return 0
+
+    categories = sorted(categories)
+    with transaction.atomic():
+        ProductAlternative.objects.filter(product__category__in=categories).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _rebuild_sql(len(categories)),
+                [MAX_PRICE_RATIO, *categories, ALTERNATIVES_TOP_K]
+            )
+            inserted = cursor.rowcount
+        bump_catalog_version(categories)
+    return inserted
+
+
+def affected_sources(product_ids: Iterable[int], referrers: Iterable[int] = ()) -> Set[int]:
+    """
+    Productos cuyas alternativas pueden cambiar si cambian `product_ids`.
+
+    - Los propios productos (origen)
+    - Los que hoy los tienen como alternativa, más `referrers` (los que los
+      tenían antes de eliminarlos: el CASCADE ya borró esas filas)
+    - Los de su categoría en los que ahora califican por precio y que
+      tienen menos de K alternativas o una K-ésima peor rankeada
+    """
+    product_ids = list(product_ids)
+    changed = list(
+        Product.objects.filter(id__in=product_ids).values_list('id', 'category', 'price', 'sustainability_score')
+    )
+    sources = {pk for pk, *_ in changed} | set(referrers)
+    sources |= set(
+        ProductAlternative.objects.filter(alternative_id__in=product_ids).values_list('product_id', flat=True)
+    )
+    if not changed:
+        return sources
+
+    ratio = Decimal(str(MAX_PRICE_RATIO))
+    eligible = Q()
+    for pk, category, price, _ in changed:
+        # Margen de un centavo: incluir de más solo cuesta recalcular
+        eligible |= Q(category=category, price__gte=price / ratio - Decimal('0.01'))
+    kth = ProductAlternative.objects.filter(product=OuterRef('pk'), position=ALTERNATIVES_TOP_K)
+    candidates = (
+        Product.objects.filter(eligible)
+        .annotate(
+            kth_id=Subquery(kth.values('alternative_id')[:1]),
+            kth_score=Subquery(kth.values('alternative__sustainability_score')[:1]),
+        )
+        .values_list('id', 'category', 'kth_id', 'kth_score')
+    )
+    for source_id, source_category, kth_id, kth_score in candidates:
+        if source_id in sources:
+            continue
+        for pk, category, _, score in changed:
+            if pk == source_id or category != source_category:
+                continue
+            if kth_id is None or _rank_key(score, pk) < _rank_key(kth_score, kth_id):
+                sources.add(source_id)
+                break
+    return sources
+
+
+def rebuild_product_alternatives(product_ids: Iterable[int], referrers: Iterable[int] = ()) -> int:
+    """
+    Reconstruye solo las filas afectadas por cambios en unos productos (ver
+    affected_sources), en vez de la categoría completa.
+
+    Returns:
+        int: Número de filas insertadas
+    """
+    with transaction.atomic():
+        sources = sorted(affected_sources(product_ids, referrers))
+        if not sources:
+            return 0
+
+        qn = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(sources))
+        ProductAlternative.objects.filter(product_id__in=sources).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _insert_sql(f"p.{qn('id')} IN ({placeholders})"),
+                [MAX_PRICE_RATIO, *sources, ALTERNATIVES_TOP_K]
+            )
+            inserted = cursor.rowcount
+        # Igual que rebuild_alternatives: invalida lo cacheado antes de terminar
+        bump_catalog_version(set(
+            Product.objects.filter(id__in=sources).values_list('category', flat=True).distinct()
+        ))
+    return inserted
+
+
+@contextmanager
+def deferred_rebuild():
+    """
+    Acumula las categorías modificadas dentro del bloque y las reconstruye
+    una sola vez al salir. Pensado para importaciones masivas.
+    """
+    if getattr(_deferred, 'categories', None) is not None:
+        yield
+        return
+
+    _deferred.categories = set()
+    try:
+        yield
+    finally:
+        categories, _deferred.categories = _deferred.categories, None
+
+    if categories:
+        rebuild_alternatives(categories)
+
+
+def mark_category_dirty(category: str):
+    """Programa la reconstrucción de una categoría tras el commit actual"""
+    pending = getattr(_deferred, 'categories', None)
+    if pending is not None:
+        pending.add(category)
+        return
+    transaction.on_commit(lambda: rebuild_alternatives([category]))
+
+
+def mark_product_dirty(product_id: int, categories: Iterable[str], referrers: Iterable[int] = ()):
+    """
+    Programa la reconstrucción de las filas afectadas por un producto tras
+    el commit actual. Dentro de deferred_rebuild se acumulan sus categorías.
+
+    Args:
+        categories: categorías del producto (actual y anterior)
+        referrers: productos que lo tenían como alternativa, si se eliminó
+    """
+    pending = getattr(_deferred, 'categories', None)
+    if pending is not None:
+        pending.update(categories)
+        return
+    referrers = list(referrers)
+    transaction.on_commit(lambda: rebuild_product_alternatives([product_id], referrers))
+
+
+def rank_alternatives(product_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Calcula en vivo las alternativas de varios productos con una sola
+    consulta con ROW_NUMBER(), sin pasar por la tabla materializada.
+
+    Returns:
+        dict: {product_id: [alternative_id, ...]} en orden de ranking
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    sql = _ranked_sql(f"p.{qn('id')} IN ({placeholders})") + ' ORDER BY product_id, position'
+
+    result = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MAX_PRICE_RATIO, *product_ids, ALTERNATIVES_TOP_K])
+        for product_id, alternative_id, _ in cursor.fetchall():
+            result.setdefault(product_id, []).append(alternative_id)
+    return result
+
+
+def resolve_alternative_ids(product_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Ids de alternativas para varios productos con un número fijo de consultas.
+
+    Lee la tabla materializada y, solo para los productos sin filas (aún no
+    reconstruidos o sin alternativas), recurre a rank_alternatives.
+    """
+    product_ids = list(product_ids)
+    result = {}
+    rows = (
+        ProductAlternative.objects
+        .filter(product_id__in=product_ids)
+        .order_by('product_id', 'position')
+        .values_list('product_id', 'alternative_id')
+    )
+    for product_id, alternative_id in rows:
+        result.setdefault(product_id, []).append(alternative_id)
+
+    missing = [pid for pid in product_ids if pid not in result]
+    if missing:
+        result.update(rank_alternatives(missing))
+    return result
+
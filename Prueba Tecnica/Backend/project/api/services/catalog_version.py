@@ -0,0 +1,67 @@
+"""
+Versión del catálogo como primitiva de invalidación de cachés
+
+Cualquier caché derivada del catálogo (búsquedas, facetas, alternativas,
+optimizaciones, estadísticas) incluye la versión en su clave: cuando el
+catálogo cambia, la versión sube y las claves antiguas dejan de usarse.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Optional
+from api.models.catalog import CatalogVersion, GLOBAL_VERSION_KEY, category_version_key
+
+
+def _memo(request) -> Dict[str, int]:
+    """Versiones ya leídas en esta petición"""
+    if request is None:
+        return {}
+    if not hasattr(request, '_catalog_versions'):
+        request._catalog_versions = {}
+    return request._catalog_versions
+
+
+def get_catalog_version(category: Optional[str] = None, request=None) -> int:
+    """
+    Versión global (o de una categoría), con una lectura por clave primaria.
+    
+    Si se pasa request, el valor se memoriza durante la petición.
+    """
+    key = category_version_key(category) if category else GLOBAL_VERSION_KEY
+    memo = _memo(request)
+    if key not in memo:
+        memo[key] = (
+            CatalogVersion.objects
+            .filter(key=key)
+            .values_list('version', flat=True)
+            .first()
+        ) or 0
+    return memo[key]
+
+
+def get_catalog_versions(categories: Iterable[str], request=None) -> Dict[str, int]:
+    """Versiones de varias categorías en una sola consulta"""
+    categories = list(categories)
+    memo = _memo(request)
+    missing = [category_version_key(c) for c in categories if category_version_key(c) not in memo]
+    if missing:
+        found = dict(CatalogVersion.objects.filter(key__in=missing).values_list('key', 'version'))
+        for key in missing:
+            memo[key] = found.get(key, 0)
+    return {c: memo[category_version_key(c)] for c in categories}
+
+
+def bump_catalog_version(categories: Iterable[str] = ()):
+    """Incrementa la versión global y la de las categorías indicadas"""
+    CatalogVersion.objects.bump(categories)
+
+
+def catalog_cache_key(namespace: str, *parts, category: Optional[str] = None, request=None) -> str:
+    """
+    Clave de caché ligada a la versión del catálogo.
+    
+    Ejemplo: catalog_cache_key('facets', 'category=lacteos') ->
+    'facets:all:v42:<md5 de las partes>'
+    """
+    version = get_catalog_version(category, request=request)
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest() if parts else 'all'
+    return f'{namespace}:{category or "all"}:v{version}:{digest}'
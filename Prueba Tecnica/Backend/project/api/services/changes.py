@@ -0,0 +1,126 @@
+"""
+Sincronización incremental del catálogo
+
+Devuelve los productos creados/modificados (upserts) y eliminados
+(tombstones) desde un instante, en el orden (timestamp, tipo, id). La
+paginación es por cursor (keyset) sobre los índices (updated_at, id) de
+Product y (deleted_at, product_id) de ProductTombstone, así que el costo
+depende de la cantidad de cambios y no del tamaño del catálogo.
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from django.db.models import Q
+from django.utils import timezone
+from api.models.product import Product
+from api.models.tombstone import ProductTombstone
+from api.serializers.fast_list import FastProductListSerializer
+
+
+# Orden entre cambios con el mismo timestamp
+CHANGE_UPSERT = 0
+CHANGE_DELETE = 1
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 2000
+
+# Los cambios más recientes que esto no se entregan todavía: updated_at se
+# fija antes del commit, y una transacción lenta podría confirmar después
+# un timestamp anterior al cursor ya entregado
+SETTLE_DELAY = timedelta(seconds=2)
+
+Position = Tuple[datetime, int, int]
+
+
+def encode_cursor(position: Position) -> str:
+    timestamp, kind, pk = position
+    raw = f'{timestamp.isoformat()}|{kind}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value: str) -> Optional[Position]:
+    """Cursor opaco -> (timestamp, tipo, id); None si es inválido"""
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        timestamp, kind, pk = raw.split('|')
+        timestamp = datetime.fromisoformat(timestamp)
+        if timezone.is_naive(timestamp):
+            return None
+        return timestamp, int(kind), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def since_position(since: datetime) -> Position:
+    """Posición justo antes de cualquier cambio en `since` (inclusive)"""
+    return since, -1, 0
+
+
+def _after(position: Optional[Position], kind: int, ts_field: str, id_field: str) -> Q:
+    """Filas de este tipo que van después de la posición en el orden global"""
+    if position is None:
+        return Q()
+    timestamp, cursor_kind, cursor_id = position
+    condition = Q(**{f'{ts_field}__gt': timestamp})
+    if kind > cursor_kind:
+        condition |= Q(**{ts_field: timestamp})
+    elif kind == cursor_kind:
+        condition |= Q(**{ts_field: timestamp, f'{id_field}__gt': cursor_id})
+    return condition
+
+
+def get_changes(position: Optional[Position], limit: int = CHANGES_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    Siguiente lote de cambios después de `position` (None = desde el inicio).
+
+    Returns:
+        dict: {'results': [...], 'next_cursor': str o None, 'has_more': bool}
+        next_cursor es None solo si no hubo cambios y no había posición.
+    """
+    until = timezone.now() - SETTLE_DELAY
+
+    upserts = list(
+        Product.objects
+        .filter(_after(position, CHANGE_UPSERT, 'updated_at', 'id'), updated_at__lte=until)
+        .order_by('updated_at', 'id')
+        .values_list('updated_at', 'id')[:limit + 1]
+    )
+    deletes = list(
+        ProductTombstone.objects
+        .filter(_after(position, CHANGE_DELETE, 'deleted_at', 'product_id'), deleted_at__lte=until)
+        .order_by('deleted_at', 'product_id')
+        .values_list('deleted_at', 'product_id', 'barcode')[:limit + 1]
+    )
+
+    merged = sorted(
+        [(timestamp, CHANGE_UPSERT, pk, None) for timestamp, pk in upserts]
+        + [(timestamp, CHANGE_DELETE, pk, barcode) for timestamp, pk, barcode in deletes]
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    fast = FastProductListSerializer()
+    upsert_ids = [pk for _, kind, pk, _ in merged if kind == CHANGE_UPSERT]
+    products = {
+        row['id']: row
+        for row in fast.serialize(fast.prepare(Product.objects.filter(id__in=upsert_ids)))
+    } if upsert_ids else {}
+
+    results: List[Dict[str, Any]] = []
+    for timestamp, kind, pk, barcode in merged:
+        if kind == CHANGE_DELETE:
+            results.append({'type': 'delete', 'id': pk, 'barcode': barcode, 'changed_at': timestamp})
+        elif pk in products:
+            # Si se borró entre ambas consultas, su tombstone llega en otro lote
+            results.append({'type': 'upsert', 'id': pk, 'changed_at': timestamp, 'product': products[pk]})
+
+    if merged:
+        last = merged[-1]
+        position = (last[0], last[1], last[2])
+
+    return {
+        'results': results,
+        'next_cursor': encode_cursor(position) if position is not None else None,
+        'has_more': has_more,
+    }
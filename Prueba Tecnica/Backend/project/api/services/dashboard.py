@@ -0,0 +1,62 @@
+"""
+Datos del dashboard en una sola respuesta
+
+Reúne el resumen de estadísticas, los productos mejor evaluados y las
+listas de compras recientes. Las secciones del catálogo se cachean por
+versión (leída una vez por petición); las listas se leen sin sus items.
+"""
+
+from typing import Any, Dict, List
+from django.core.cache import cache
+from api.models.product import Product
+from api.models.shopping import ShoppingList
+from api.serializers.fast_list import FastProductListSerializer
+from api.serializers.shopping_serializer import ShoppingListSummarySerializer
+from api.services.catalog_version import catalog_cache_key
+from api.services.stats import CACHE_TIMEOUT, get_summary
+
+
+DASHBOARD_TOP_PRODUCTS = 5
+DASHBOARD_RECENT_LISTS = 5
+DASHBOARD_MAX_ITEMS = 20
+
+
+def get_top_products(limit: int, request=None) -> List[Dict[str, Any]]:
+    """Productos con mayor score (índice sobre sustainability_score)"""
+    key = catalog_cache_key('dashboard-top', limit, request=request)
+    products = cache.get(key)
+    if products is None:
+        fast = FastProductListSerializer()
+        queryset = (
+            Product.objects
+            .filter(sustainability_score__isnull=False)
+            .order_by('-sustainability_score', '-id')
+        )
+        products = fast.serialize(fast.prepare(queryset)[:limit])
+        cache.set(key, products, CACHE_TIMEOUT)
+    return products
+
+
+def get_recent_lists(limit: int) -> List[Dict[str, Any]]:
+    """
+    Listas más recientes, solo con sus totales (una consulta, sin prefetch).
+
+    Son las de toda la instalación: ShoppingList no tiene usuario.
+    """
+    fields = ShoppingListSummarySerializer.Meta.fields
+    lists = ShoppingList.objects.only(*fields).order_by('-created_at')[:limit]
+    return ShoppingListSummarySerializer(lists, many=True).data
+
+
+def build_dashboard(request, top: int = DASHBOARD_TOP_PRODUCTS, lists: int = DASHBOARD_RECENT_LISTS) -> Dict[str, Any]:
+    """
+    Respuesta completa del dashboard.
+
+    Consultas: 1 (versión del catálogo) + 1 (listas) con caché caliente;
+    + 1 (resumen desde CategoryStats) + 1 (top productos) en frío.
+    """
+    return {
+        'summary': get_summary(request),
+        'top_products': get_top_products(top, request),
+        'recent_lists': get_recent_lists(lists),
+    }
@@ -0,0 +1,98 @@
+"""
+Exportación del catálogo en streaming (NDJSON / CSV)
+
+Las filas se leen con .values() e .iterator(chunk_size), y se escriben a
+medida que llegan: la memoria usada no depende del tamaño del catálogo.
+"""
+
+import csv
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api.renderers import FastJSONRenderer
+
+
+# Columnas exportadas (en este orden en el CSV)
+EXPORT_FIELDS = (
+    'id', 'barcode', 'name', 'brand', 'category',
+    'price', 'weight', 'unit', 'price_per_unit',
+    'nutriscore', 'ecoscore', 'origin',
+    'is_organic', 'is_fairtrade', 'is_local',
+    'image_url', 'description',
+    'carbon_footprint', 'environmental_impact_score', 'green_score', 'packaging_score',
+    'sustainability_score', 'data_source',
+    'created_at', 'updated_at',
+)
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+# Filas leídas por viaje a la base de datos / filas por bloque escrito
+EXPORT_CHUNK_SIZE = 2000
+WRITE_BATCH_SIZE = 500
+
+
+def parse_since(value: str) -> Optional[datetime]:
+    """
+    ISO 8601 -> datetime con zona horaria; None si el valor es inválido.
+
+    Acepta '+' sin codificar en la URL (llega como espacio).
+    """
+    parsed = parse_datetime(value.strip().replace(' ', '+'))
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_rows(queryset) -> Iterator[Dict]:
+    """Filas del queryset como dicts, leídas por bloques"""
+    rows = queryset.select_related(None).values(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Mismo formato que la API: precio como string con 2 decimales
+        if row['price'] is not None:
+            row['price'] = str(row['price'])
+        yield row
+
+
+def _batched(lines: Iterable, join):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            yield join(batch)
+            batch = []
+    if batch:
+        yield join(batch)
+
+
+def ndjson_stream(rows: Iterable[Dict]) -> Iterator[bytes]:
+    """Un objeto JSON por línea"""
+    render = FastJSONRenderer().render
+    return _batched((render(row) + b'\n' for row in rows), b''.join)
+
+
+class _Echo:
+    """Buffer mínimo para csv.writer: devuelve lo escrito en vez de guardarlo"""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows: Iterable[Dict]) -> Iterator[str]:
+    """CSV con encabezado; fechas en ISO 8601"""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in (row[field] for field in EXPORT_FIELDS)
+            ])
+
+    return _batched(lines(), ''.join)
@@ -0,0 +1,121 @@
+"""
+Conteos de facetas para la búsqueda de productos
+
+Calcula todas las facetas (categoría, nutriscore, ecoscore, orgánico, local
+y rangos de precio) de un conjunto filtrado en una sola consulta agrupada,
+y cachea el resultado por combinación normalizada de filtros y versión
+del catálogo.
+"""
+
+from typing import Dict, Any
+from django.core.cache import cache
+from django.db.models import Case, When, Value, CharField, Count
+from api.services.catalog_version import catalog_cache_key
+
+
+# Parámetros que afectan el conjunto filtrado (ordering/page no cambian conteos)
+FACET_FILTER_PARAMS = ('category', 'min_price', 'max_price', 'min_score', 'is_organic', 'is_local')
+
+# Rangos de precio en CLP: (etiqueta, mínimo incluido, máximo excluido)
+PRICE_BUCKETS = [
+    ('0-1000', 0, 1000),
+    ('1000-2500', 1000, 2500),
+    ('2500-5000', 2500, 5000),
+    ('5000-10000', 5000, 10000),
+    ('10000+', 10000, None),
+]
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def normalize_filters(query_params) -> str:
+    """Clave estable para un conjunto de filtros, independiente del orden"""
+    parts = []
+    for name in FACET_FILTER_PARAMS:
+        value = (query_params.get(name) or '').strip()
+        if value:
+            # Los flags solo filtran con 'true'; category distingue mayúsculas
+            if name in ('is_organic', 'is_local'):
+                value = value.lower()
+            parts.append(f'{name}={value}')
+    return '&'.join(parts) or 'all'
+
+
+def _price_bucket_expression():
+    whens = [
+        When(price__lt=upper, then=Value(label))
+        for label, _, upper in PRICE_BUCKETS
+        if upper is not None
+    ]
+    return Case(*whens, default=Value(PRICE_BUCKETS[-1][0]), output_field=CharField())
+
+
+def compute_facets(queryset) -> Dict[str, Any]:
+    """
+    Calcula todas las facetas en una sola pasada agrupada.
+
+    Agrupa por todas las dimensiones a la vez y luego pliega los grupos
+    en un conteo por faceta.
+
+    Args:
+        queryset: QuerySet de productos ya filtrado
+
+    Returns:
+        dict: {'total': int, '<faceta>': [{'value': ..., 'count': int}, ...]}
+    """
+    rows = (
+        queryset
+        .order_by()
+        .annotate(price_bucket=_price_bucket_expression())
+        .values('category', 'nutriscore', 'ecoscore', 'is_organic', 'is_local', 'price_bucket')
+        .annotate(count=Count('id'))
+    )
+
+    dimensions = ('category', 'nutriscore', 'ecoscore', 'is_organic', 'is_local', 'price_bucket')
+    counters = {dimension: {} for dimension in dimensions}
+    total = 0
+
+    for row in rows:
+        total += row['count']
+        for dimension in dimensions:
+            value = row[dimension]
+            counters[dimension][value] = counters[dimension].get(value, 0) + row['count']
+
+    facets = {'total': total}
+    for dimension in ('category', 'nutriscore', 'ecoscore', 'is_organic', 'is_local'):
+        facets[dimension] = [
+            {'value': value, 'count': count}
+            for value, count in sorted(counters[dimension].items(), key=lambda kv: (-kv[1], str(kv[0])))
+        ]
+
+    # Los rangos de precio se devuelven en orden ascendente, incluyendo vacíos
+    facets['price'] = [
+        {
+            'value': label,
+            'min': lower,
+            'max': upper,
+            'count': counters['price_bucket'].get(label, 0),
+        }
+        for label, lower, upper in PRICE_BUCKETS
+    ]
+
+    return facets
+
+
+def get_facets(queryset, query_params, request=None) -> Dict[str, Any]:
+    """
+    Facetas cacheadas por filtros normalizados y versión del catálogo.
+
+    Si se filtra por categoría basta con la versión de esa categoría.
+    """
+    key = catalog_cache_key(
+        'facets',
+        normalize_filters(query_params),
+        category=query_params.get('category') or None,
+        request=request,
+    )
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,86 @@
+"""
+Servicio de productos similares
+
+Mantiene en memoria el índice de vectores de características del catálogo
+(api.algorithms.similarity). Las señales lo refrescan en el proceso que
+escribe; además, cada consulta compara la versión del catálogo con la del
+índice y, si cambió (escrituras masivas u otros procesos), aplica los
+productos modificados (updated_at) y eliminados (tombstones) desde la
+última sincronización.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Tuple
+from django.utils import timezone
+from api.models.product import Product
+from api.models.tombstone import ProductTombstone
+from api.algorithms.similarity import SimilarityIndex, FEATURE_FIELDS
+from api.services.catalog_version import get_catalog_version
+from api.services.changes import SETTLE_DELAY
+
+
+class ProductSimilarityService:
+    """Índice de similitud del catálogo, cargado de forma perezosa"""
+    
+    def __init__(self):
+        self.index = SimilarityIndex()
+        self._loaded = False
+        self._version = None
+        self._synced_at = None
+        self._load_lock = threading.Lock()
+    
+    def _ensure_loaded(self):
+        """Carga el índice o lo pone al día con la versión del catálogo"""
+        version = get_catalog_version()
+        if self._loaded and version == self._version:
+            return
+        with self._load_lock:
+            # La versión se lee antes que los productos: una escritura
+            # confirmada durante la carga deja el índice desfasado y se
+            # aplica en la próxima consulta
+            started = timezone.now()
+            if not self._loaded:
+                self.index.build(Product.objects.values(*FEATURE_FIELDS).iterator(chunk_size=2000))
+            elif version != self._version:
+                # Margen para transacciones que fijaron updated_at antes de
+                # la última sincronización pero confirmaron después
+                since = self._synced_at - SETTLE_DELAY
+                self.index.remove(
+                    ProductTombstone.objects.filter(deleted_at__gte=since).values_list('product_id', flat=True)
+                )
+                self.index.upsert(list(Product.objects.filter(updated_at__gte=since).values(*FEATURE_FIELDS)))
+            else:
+                return
+            self._version, self._synced_at, self._loaded = version, started, True
+    
+    def reload(self):
+        """Descarta el índice; se reconstruye en la próxima consulta"""
+        with self._load_lock:
+            self._loaded = False
+    
+    def refresh(self, product_ids: Iterable[int]):
+        """Actualiza solo los productos indicados (si el índice ya está cargado)"""
+        if not self._loaded:
+            return
+        product_ids = set(product_ids)
+        rows = list(Product.objects.filter(id__in=product_ids).values(*FEATURE_FIELDS))
+        self.index.upsert(rows)
+        self.index.remove(product_ids - {row['id'] for row in rows})
+    
+    def remove(self, product_ids: Iterable[int]):
+        if self._loaded:
+            self.index.remove(product_ids)
+    
+    def similar(self, product_ids: Iterable[int], k: int = 5) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Top-k similares por coseno para varios productos a la vez.
+        
+        Returns:
+            dict: {product_id: [(similar_id, similarity), ...]}
+        """
+        self._ensure_loaded()
+        return self.index.top_k(list(product_ids), k)
+
+
+# Instancia global del servicio
+similarity_service = ProductSimilarityService()
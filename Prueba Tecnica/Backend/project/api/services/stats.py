@@ -0,0 +1,128 @@
+"""
+Estadísticas generales del catálogo
+
+El resumen se arma desde CategoryStats (mantenida en cada escritura) y las
+distribuciones con una lectura en streaming de las columnas numéricas;
+ambos se cachean con la versión global del catálogo.
+"""
+
+from decimal import Context
+from typing import Any, Dict
+import numpy as np
+from django.core.cache import cache
+from api.algorithms.distributions import compute_distributions
+from api.models.product import Product
+from api.models.stats import CategoryStats, SCORE_FIELDS
+from api.services.catalog_version import catalog_cache_key
+
+
+CACHE_TIMEOUT = 60 * 60
+
+# Filas leídas por viaje a la base de datos al armar las distribuciones
+DISTRIBUTION_CHUNK_SIZE = 2000
+
+# Columnas leídas para las distribuciones (scores vía LEFT JOIN)
+DISTRIBUTION_COLUMNS = (
+    'price', 'weight',
+    *(f'sustainability__{field}' for field in SCORE_FIELDS),
+    'carbon_footprint', 'environmental_impact_score', 'green_score',
+)
+
+# Mismo formato que devolvía Avg('price') en SQLite (15 dígitos significativos)
+_AVG_CONTEXT = Context(prec=15)
+
+
+def compute_summary() -> Dict[str, Any]:
+    """
+    Totales, promedios de scores, rango de precios y productos por categoría.
+    
+    Se lee de CategoryStats (una fila por categoría) y se agrega en Python.
+    """
+    rows = list(CategoryStats.objects.filter(product_count__gt=0))
+    
+    total_products = sum(row.product_count for row in rows)
+    score_count = sum(row.score_count for row in rows)
+    
+    # Estadísticas de sostenibilidad
+    sustainability_stats = {
+        f'avg_{field[:-len("_score")]}': (
+            sum(getattr(row, f'{field}_sum') for row in rows) / score_count
+            if score_count else None
+        )
+        for field in SCORE_FIELDS
+    }
+    
+    # Estadísticas de precios
+    price_stats = {
+        'min_price': min((row.price_min for row in rows if row.price_min is not None), default=None),
+        'max_price': max((row.price_max for row in rows if row.price_max is not None), default=None),
+        'avg_price': (
+            _AVG_CONTEXT.create_decimal_from_float(float(sum(row.price_sum for row in rows)) / total_products)
+            if total_products else None
+        ),
+    }
+    
+    # Productos por categoría
+    products_by_category = [
+        {'category': row.category, 'count': row.product_count}
+        for row in sorted(rows, key=lambda row: (-row.product_count, row.category))
+    ]
+    
+    return {
+        'total_products': total_products,
+        'sustainability_stats': sustainability_stats,
+        'price_stats': price_stats,
+        'products_by_category': products_by_category,
+    }
+
+
+def get_summary(request=None) -> Dict[str, Any]:
+    """Resumen cacheado por versión del catálogo"""
+    key = catalog_cache_key('stats-summary', request=request)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary()
+        cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
+
+
+def compute_catalog_distributions() -> Dict[str, Any]:
+    """
+    Histogramas, cuantiles y calidad de datos del catálogo completo.
+    
+    Las tuplas (categoría, precio, peso, scores, carbono) se leen una sola
+    vez; el cálculo se hace después sobre arrays de NumPy.
+    """
+    rows = (
+        Product.objects.order_by()
+        .values_list('category', *DISTRIBUTION_COLUMNS)
+        .iterator(chunk_size=DISTRIBUTION_CHUNK_SIZE)
+    )
+    categories = []
+    values = []
+    for category, *numbers in rows:
+        categories.append(category)
+        values.append(numbers)
+    
+    # None -> NaN; Decimal -> float
+    matrix = np.array(values, dtype=float).reshape(len(values), len(DISTRIBUTION_COLUMNS))
+    columns = {
+        name.replace('sustainability__', ''): matrix[:, i]
+        for i, name in enumerate(DISTRIBUTION_COLUMNS)
+    }
+    weight = columns.pop('weight')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Mismo criterio que Product.compute_price_per_unit
+        columns['price_per_kg'] = np.where(weight > 0, columns['price'] * 1000 / weight, np.nan)
+    
+    return compute_distributions(columns, np.array(categories, dtype=str))
+
+
+def get_distributions(request=None) -> Dict[str, Any]:
+    """Distribuciones cacheadas por versión del catálogo"""
+    key = catalog_cache_key('stats-distributions', request=request)
+    distributions = cache.get(key)
+    if distributions is None:
+        distributions = compute_catalog_distributions()
+        cache.set(key, distributions, CACHE_TIMEOUT)
+    return distributions
@@ -0,0 +1,88 @@
+"""
+Señales del catálogo
+
+Mantiene los datos derivados del catálogo cuando cambia un producto o su
+score de sostenibilidad: versión del catálogo (en la misma transacción),
+alternativas precalculadas, índice de similitud (tras el commit) y
+registro de productos eliminados para la sincronización incremental y
+estadísticas por categoría (deltas en la misma transacción).
+
+También mantiene los totales de las listas de compras cuando cambian sus
+items, con deltas en la misma transacción que la escritura del item.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from api.models.alternative import ProductAlternative
+from api.models.product import Product
+from api.models.shopping import ShoppingList, ShoppingListItem
+from api.models.sustainability import SustainabilityScore
+from api.models.tombstone import ProductTombstone
+from api.models.stats import CategoryStats
+from api.services.catalog_version import bump_catalog_version
+from api.services.alternatives import mark_product_dirty
+from api.services.similarity import similarity_service
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Sube la versión, actualiza estadísticas, reconstruye sus alternativas y refresca su vector"""
+    CategoryStats.objects.product_saved(instance, kwargs['created'])
+    categories = instance.affected_categories
+    bump_catalog_version(categories)
+    mark_product_dirty(instance.pk, categories)
+    product_id = instance.pk
+    transaction.on_commit(lambda: similarity_service.refresh([product_id]))
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    # El CASCADE borra las filas que lo tienen como alternativa antes de post_delete
+    instance._alternative_referrers = list(
+        ProductAlternative.objects.filter(alternative_id=instance.pk).values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    ProductTombstone.record(instance)
+    CategoryStats.objects.product_deleted(instance)
+    bump_catalog_version(instance.affected_categories)
+    mark_product_dirty(instance.pk, {instance.category}, getattr(instance, '_alternative_referrers', ()))
+    product_id = instance.pk
+    transaction.on_commit(lambda: similarity_service.remove([product_id]))
+
+
+@receiver(post_save, sender=SustainabilityScore)
+@receiver(post_delete, sender=SustainabilityScore)
+def score_changed(sender, instance, **kwargs):
+    """
+    Un nuevo score cambia las estadísticas de su categoría.
+    
+    La versión del catálogo y la reconstrucción de alternativas ya se
+    programan al sincronizar Product.sustainability_score (ProductQuerySet.update).
+    """
+    if instance._meta.get_field('product').is_cached(instance):
+        category = instance.product.category
+    else:
+        category = Product.objects.filter(pk=instance.product_id).values_list('category', flat=True).first()
+    if category is None:
+        return
+    if kwargs['signal'] is post_delete:
+        CategoryStats.objects.score_deleted(instance, category)
+    else:
+        CategoryStats.objects.score_saved(instance, kwargs['created'], category)
+
+
+@receiver(post_save, sender=ShoppingListItem)
+def shopping_item_saved(sender, instance, **kwargs):
+    ShoppingList.objects.item_saved(instance, kwargs['created'])
+
+
+@receiver(post_delete, sender=ShoppingListItem)
+def shopping_item_deleted(sender, instance, origin=None, **kwargs):
+    # Si se elimina la lista completa no hay totales que mantener
+    if isinstance(origin, ShoppingList) or getattr(origin, 'model', None) is ShoppingList:
+        return
+    ShoppingList.objects.item_deleted(instance)
@@ -1,3 +1,1338 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import combinations
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.parse import quote
+from uuid import UUID
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import caches
+from django.db import DatabaseError, connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.algorithms.distributions import PRICE_BINS, QUANTILES, grouped_quantiles
+from api.models import Product, ProductAlternative, ProductEcoscoreData, ShoppingList, ShoppingListItem, SustainabilityScore
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import ProductListSerializer
+from api.serializers.fast_list import FastProductListSerializer
+from api.serializers.fragment_cache import fragment_stats
+from api.services.alternatives import rank_alternatives, rebuild_alternatives
+from api.services.catalog_version import get_catalog_version
+from api.services.changes import SETTLE_DELAY
+from api.services.export import EXPORT_FIELDS, parse_since
+from api.services.facets import PRICE_BUCKETS
+from api.services.similarity import similarity_service
+from api.services.stats import compute_catalog_distributions
+from api.views.product_views import ProductViewSet
+
+
+def seed_catalog(n=200):
+    """Crea un catálogo sintético con variedad de categorías, precios y flags"""
+    categories = ['granos', 'lacteos', 'carnes', 'frutas', 'bebidas', 'snacks']
+    products = Product.objects.bulk_create([
+        Product(
+            barcode=f'780000{i:07d}',
+            name=f'Producto {i}',
+            brand=f'Marca {i % 7}',
+            category=categories[i % len(categories)],
+            price=500 + (i * 37) % 4500,
+            weight=250 + (i * 53) % 1750,
+            price_per_unit=Product.compute_price_per_unit(500 + (i * 37) % 4500, 250 + (i * 53) % 1750),
+            nutriscore='ABCDE'[i % 5],
+            ecoscore='ABCDE'[(i * 3) % 5],
+            is_organic=i % 4 == 0,
+            is_local=i % 3 == 0,
+            carbon_footprint=50 + (i * 17) % 900,
+            sustainability_score=(i * 13) % 100,
+        )
+        for i in range(n)
+    ])
+    SustainabilityScore.objects.bulk_create([
+        SustainabilityScore(
+            product=product,
+            economic_score=50,
+            environmental_score=50,
+            social_score=50,
+            total_score=product.sustainability_score,
+        )
+        for product in products
+    ])
+    return products
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class CatalogQueryPlanTests(TestCase):
+    """Cada combinación de filtros del catálogo debe resolverse con un índice"""
+
+    FILTERS = {
+        'category': 'lacteos',
+        'min_price': '1000',
+        'max_price': '3000',
+        'min_score': '60',
+        'is_organic': 'true',
+        'is_local': 'true',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog()
+
+    def _queryset_for(self, params):
+        request = APIRequestFactory().get('/api/products/', params)
+        view = ProductViewSet(action='list', format_kwarg=None)
+        view.request = Request(request)
+        return view.get_queryset()
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_filter_combinations_use_an_index(self):
+        names = list(self.FILTERS)
+        for size in range(1, len(names) + 1):
+            for combo in combinations(names, size):
+                params = {name: self.FILTERS[name] for name in combo}
+                plan = self._plan(self._queryset_for(params))
+                with self.subTest(filters=combo):
+                    # Recorrer un índice parcial es válido; un SCAN sin índice no
+                    scans = [
+                        line for line in plan
+                        if line.startswith('SCAN api_product') and 'INDEX' not in line
+                    ]
+                    self.assertEqual(scans, [], f'Plan con table scan: {plan}')
+
+    def test_ordering_options_use_an_index(self):
+        for ordering in ProductViewSet.ORDERING_OPTIONS:
+            plan = self._plan(self._queryset_for({'ordering': ordering}))
+            with self.subTest(ordering=ordering):
+                self.assertFalse(
+                    any('USE TEMP B-TREE FOR ORDER BY' in line for line in plan),
+                    f'Ordenamiento sin índice: {plan}'
+                )
+
+
+class OrderingNullsLastTests(TestCase):
+    """Los productos sin dato van al final en los ordenamientos nullable"""
+
+    NULLABLE = ('price_per_unit', 'sustainability_score', 'carbon_footprint')
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(10)
+        cls.empty = Product.objects.create(
+            barcode='7900000000099', name='Sin datos', category='granos', price='1.00', weight=0,
+        )
+
+    def setUp(self):
+        caches['responses'].clear()
+
+    def test_null_rows_come_last_in_both_directions(self):
+        for field in self.NULLABLE:
+            for ordering in (field, f'-{field}'):
+                with self.subTest(ordering=ordering):
+                    results = self.client.get('/api/products/', {'ordering': ordering}).json()['results']
+                    self.assertEqual(results[-1]['id'], self.empty.id)
+                    products = Product.objects.in_bulk([row['id'] for row in results])
+                    values = [getattr(products[row['id']], field) for row in results[:-1]]
+                    self.assertEqual(values, sorted(values, reverse=ordering.startswith('-')))
+
+
+class FacetsTests(TestCase):
+    """Conteos de facetas: filtros combinados, rangos de precio y caché"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(60)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def _facets(self, params):
+        response = self.client.get('/api/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @staticmethod
+    def _counts(facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_combined_filters(self):
+        facets = self._facets({'category': 'granos', 'is_organic': 'true'})
+        expected = [p for p in self.products if p.category == 'granos' and p.is_organic]
+        self.assertTrue(expected)
+
+        self.assertEqual(facets['total'], len(expected))
+        self.assertEqual(self._counts(facets['category']), {'granos': len(expected)})
+        self.assertEqual(self._counts(facets['is_organic']), {True: len(expected)})
+        nutriscores = {}
+        for product in expected:
+            nutriscores[product.nutriscore] = nutriscores.get(product.nutriscore, 0) + 1
+        self.assertEqual(self._counts(facets['nutriscore']), nutriscores)
+
+    def test_price_buckets(self):
+        facets = self._facets({})
+        self.assertEqual(
+            [(bucket['value'], bucket['min'], bucket['max']) for bucket in facets['price']],
+            [(label, lower, upper) for label, lower, upper in PRICE_BUCKETS],
+        )
+        for bucket in facets['price']:
+            expected = sum(
+                1 for p in self.products
+                if p.price >= bucket['min'] and (bucket['max'] is None or p.price < bucket['max'])
+            )
+            with self.subTest(bucket=bucket['value']):
+                self.assertEqual(bucket['count'], expected)
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price']), len(self.products))
+
+    def test_second_call_is_cached(self):
+        params = {'category': 'granos', 'min_price': '1000'}
+        first = self._facets(params)
+        # Solo la lectura de la versión de la categoría
+        with self.assertNumQueries(1):
+            second = self._facets({'min_price': '1000', 'category': 'granos'})
+        self.assertEqual(first, second)
+
+    def test_saving_a_product_in_the_category_invalidates(self):
+        params = {'category': 'granos'}
+        before = self._facets(params)
+
+        product = Product.objects.filter(category='granos').order_by('id').first()
+        product.is_organic = not product.is_organic
+        product.save()
+
+        after = self._facets(params)
+        self.assertNotEqual(self._counts(before['is_organic']), self._counts(after['is_organic']))
+        self.assertEqual(
+            self._counts(after['is_organic']).get(True, 0),
+            Product.objects.filter(category='granos', is_organic=True).count(),
+        )
+
+
+class DistributionsTests(TestCase):
+    """Cuantiles e histogramas vectorizados vs. NumPy"""
+
+    def _seed(self):
+        products = seed_catalog(60)
+        # Categoría con una sola fila
+        single = Product.objects.create(
+            barcode='7900000000077', name='Único', category='unico', price='1234.00', weight=500,
+            carbon_footprint=321,
+        )
+        return products, single
+
+    def _expected_quantiles(self, values):
+        return {
+            f'p{int(q * 100)}': round(float(np.quantile(values, q)), 2) for q in QUANTILES
+        }
+
+    def test_grouped_quantiles_match_numpy(self):
+        rng = np.random.default_rng(7)
+        values = rng.normal(50, 20, 500)
+        values[rng.random(500) < 0.1] = np.nan
+        codes = rng.integers(0, 4, 500)
+
+        result = grouped_quantiles(values, codes, 5)
+        for group in range(4):
+            group_values = values[(codes == group) & ~np.isnan(values)]
+            np.testing.assert_allclose(result[group], np.quantile(group_values, QUANTILES))
+        self.assertTrue(np.isnan(result[4]).all())
+
+    def test_catalog_quantiles_and_histograms(self):
+        products, single = self._seed()
+        data = compute_catalog_distributions()
+        everything = [*products, single]
+
+        prices = np.array([float(p.price) for p in everything])
+        self.assertEqual(data['total_products'], len(everything))
+        self.assertEqual(data['quantiles']['price'], self._expected_quantiles(prices))
+        counts, _ = np.histogram(prices, bins=PRICE_BINS)
+        self.assertEqual(data['histograms']['price']['counts'], counts.tolist())
+
+        by_category = {entry['category']: entry for entry in data['categories']}
+        for category in {p.category for p in products}:
+            scores = np.array([p.sustainability_score for p in products if p.category == category], dtype=float)
+            with self.subTest(category=category):
+                self.assertEqual(by_category[category]['total_score'], self._expected_quantiles(scores))
+
+    def test_single_row_category(self):
+        self._seed()
+        entry = next(e for e in compute_catalog_distributions()['categories'] if e['category'] == 'unico')
+
+        self.assertEqual(entry['count'], 1)
+        self.assertEqual(entry['price'], {'p10': 1234.0, 'p50': 1234.0, 'p90': 1234.0})
+        self.assertEqual(entry['carbon_footprint'], {'p10': 321.0, 'p50': 321.0, 'p90': 321.0})
+        # Sin score: cuantiles vacíos e histograma en cero
+        self.assertEqual(entry['total_score'], {'p10': None, 'p50': None, 'p90': None})
+        self.assertEqual(sum(entry['total_score_histogram']), 0)
+
+    def test_empty_catalog(self):
+        data = compute_catalog_distributions()
+        self.assertEqual(data['total_products'], 0)
+        self.assertEqual(data['categories'], [])
+        self.assertEqual(data['data_quality'], {'real_data': 0, 'hybrid': 0, 'calculated': 0})
+        # Contrato: los histogramas conservan sus clases, con conteos en cero
+        for name, histogram in data['histograms'].items():
+            with self.subTest(histogram=name):
+                self.assertEqual(histogram['counts'], [0] * (len(histogram['bins']) - 1))
+        for name, quantiles in data['quantiles'].items():
+            with self.subTest(quantiles=name):
+                self.assertEqual(quantiles, {'p10': None, 'p50': None, 'p90': None})
+
+
+class FastJSONTests(SimpleTestCase):
+    """FastJSONRenderer / FastJSONParser vs. los de DRF"""
+
+    PAYLOAD = {
+        'price': Decimal('1234.50'),
+        'aware': datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+        'naive': datetime(2024, 1, 2, 3, 4, 5),
+        'day': date(2024, 1, 2),
+        'at': time(1, 2, 3),
+        'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+        'nested': [{'values': [1, 2.5, 0.1, None, True, False]}, {'text': 'ñandú \u2028 fin'}],
+        'empty': {'list': [], 'dict': {}},
+    }
+
+    @skipUnless(orjson, 'orjson no está instalado')
+    def test_renderer_matches_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.PAYLOAD), JSONRenderer().render(self.PAYLOAD))
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render(self.PAYLOAD)
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_fallback_without_orjson(self):
+        body = JSONRenderer().render(self.PAYLOAD)
+        with patch('api.renderers.orjson', None), patch('api.parsers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.PAYLOAD), body)
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'value': float('nan')})
+
+    @skipUnless(orjson, 'orjson no está instalado')
+    def test_nan_is_rendered_as_null(self):
+        # Diferencia documentada: DRF lanza ValueError
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'value': float('nan')})
+        self.assertEqual(FastJSONRenderer().render({'value': float('nan')}), b'{"value":null}')
+
+
+class BulkLookupTests(TestCase):
+    """POST /products/bulk/ por ids y códigos de barras"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(5)
+
+    def _bulk(self, body):
+        return self.client.post('/api/products/bulk/', body, content_type='application/json')
+
+    def test_found_and_missing_keys(self):
+        a, b = self.products[0], self.products[1]
+        response = self._bulk({'ids': [a.id, 999999], 'barcodes': [b.barcode, '0000000000000']})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data['ids'][str(a.id)]['product']['id'], a.id)
+        self.assertEqual(data['ids']['999999'], {'found': False})
+        self.assertEqual(data['barcodes'][b.barcode]['product']['id'], b.id)
+        self.assertEqual(data['barcodes']['0000000000000'], {'found': False})
+        self.assertEqual(data['found'], 2)
+
+    def test_duplicates_are_resolved_once(self):
+        a = self.products[2]
+        response = self._bulk({'ids': [a.id, a.id, str(a.id)], 'barcodes': [a.barcode, a.barcode]})
+        data = response.json()
+        self.assertEqual(list(data['ids']), [str(a.id)])
+        self.assertEqual(list(data['barcodes']), [a.barcode])
+        self.assertEqual(data['found'], 1)
+
+    def test_detail_uses_the_full_serializer(self):
+        a = self.products[3]
+        product = self._bulk({'ids': [a.id], 'detail': True}).json()['ids'][str(a.id)]['product']
+        self.assertIn('sustainability', product)
+
+    def test_max_keys(self):
+        with patch.object(ProductViewSet, 'MAX_BULK_LOOKUP', 3):
+            response = self._bulk({'ids': [1, 2], 'barcodes': ['a', 'b']})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_invalid_types(self):
+        cases = [
+            {},
+            {'ids': 5},
+            {'barcodes': 'abc'},
+            {'ids': ['uno']},
+            {'ids': [{'id': 1}]},
+            {'barcodes': [{'a': 1}, 5]},
+            {'barcodes': [None]},
+        ]
+        for body in cases:
+            with self.subTest(body=body):
+                response = self._bulk(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class EcoscoreDataTests(TestCase):
+    """JSON del Eco-Score en ProductEcoscoreData y el endpoint ecoscore-details"""
+
+    SMALL = {'grade': 'b', 'score': 71}
+    LARGE = {
+        'grade': 'c',
+        'agribalyse': {'co2_total': 1.23, 'steps': [{'name': f'paso {i}', 'co2': i / 10} for i in range(60)]},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(3)
+
+    def test_round_trip(self):
+        for data, compressed in ((self.SMALL, False), (self.LARGE, True)):
+            with self.subTest(compressed=compressed):
+                ProductEcoscoreData.store(self.products[0], data)
+                stored = ProductEcoscoreData.objects.get(product=self.products[0])
+                self.assertEqual(stored.compressed, compressed)
+                self.assertEqual(stored.data, data)
+        self.assertLess(len(bytes(stored.payload)), len(json.dumps(self.LARGE)))
+
+    def test_store_keeps_the_product_flag(self):
+        product = self.products[1]
+        ProductEcoscoreData.store(product, self.SMALL)
+        self.assertTrue(Product.objects.get(pk=product.pk).has_ecoscore_data)
+
+        ProductEcoscoreData.store(product, None)
+        self.assertFalse(ProductEcoscoreData.objects.filter(product=product).exists())
+        self.assertFalse(Product.objects.get(pk=product.pk).has_ecoscore_data)
+
+    def test_details_endpoint(self):
+        with_data, without_data = self.products[0], self.products[2]
+        ProductEcoscoreData.store(with_data, self.LARGE)
+
+        response = self.client.get(f'/api/products/{with_data.id}/ecoscore-details/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ecoscore_data'], self.LARGE)
+
+        response = self.client.get(f'/api/products/{without_data.id}/ecoscore-details/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['ecoscore_data'])
+
+    def test_environmental_data_advertises_the_details(self):
+        with_data, without_data = self.products[0], self.products[2]
+        ProductEcoscoreData.store(with_data, self.SMALL)
+
+        data = self.client.get(f'/api/products/{with_data.id}/').json()['environmental_data']
+        self.assertTrue(data['detailed_data_available'])
+        self.assertEqual(data['ecoscore_details_url'], f'/api/products/{with_data.id}/ecoscore-details/')
+
+        data = self.client.get(f'/api/products/{without_data.id}/').json()['environmental_data']
+        self.assertNotIn('ecoscore_details_url', data)
+
+
+class FastListSerializerParityTests(TestCase):
+    """FastProductListSerializer debe producir el mismo JSON que ProductListSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(60)
+        # Casos borde: sin score, sin peso, con green_score / impacto, con imagen
+        Product.objects.bulk_create([
+            Product(barcode='7900000000001', name='Sin score', category='granos', price='1234.50', weight=0),
+            Product(
+                barcode='7900000000002', name='Green', category='frutas', price='999.99', weight=500,
+                green_score=15, environmental_impact_score=0.42, image_url='https://example.com/a.jpg',
+            ),
+            Product(barcode='7900000000003', name='Impacto', category='frutas', price='10', weight=1,
+                    environmental_impact_score=3.5, ecoscore='X'),
+        ])
+
+    def setUp(self):
+        caches['fragments'].clear()
+
+    def _render(self, data):
+        return JSONRenderer().render(data)
+
+    def _assert_parity(self, fields=None, exclude=None):
+        queryset = Product.objects.select_related('sustainability').order_by('id')
+        expected = ProductListSerializer(queryset, many=True, fields=fields, exclude=exclude).data
+        fast = FastProductListSerializer(fields, exclude)
+        self.assertEqual(self._render(fast.serialize(fast.prepare(queryset))), self._render(expected))
+
+    def test_full_field_set(self):
+        self._assert_parity()
+
+    def test_sparse_field_sets(self):
+        self._assert_parity(fields=['id', 'price', 'sustainability_score'])
+        self._assert_parity(exclude=['environmental_quality', 'barcode'])
+
+    def test_list_endpoint_matches_model_serializer(self):
+        caches['responses'].clear()
+        response = self.client.get('/api/products/', {'ordering': 'price', 'page': 2})
+        queryset = Product.objects.select_related('sustainability').order_by('price', 'id')[20:40]
+        expected = ProductListSerializer(queryset, many=True).data
+        self.assertEqual(self._render(response.data['results']), self._render(expected))
+
+
+class DashboardQueryBudgetTests(TestCase):
+    """GET /api/dashboard/ debe mantenerse dentro de un número fijo de consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(40)
+        for i in range(8):
+            ShoppingList.objects.create(name=f'Lista {i}')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_cold_and_warm_query_counts(self):
+        # versión del catálogo + CategoryStats + top productos + listas
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['top_products']), 5)
+        self.assertEqual(len(response.data['recent_lists']), 5)
+        self.assertEqual(response.data['summary']['total_products'], 40)
+
+        # Con caché: versión del catálogo + listas
+        with self.assertNumQueries(2):
+            self.client.get('/api/dashboard/')
+
+    def test_top_products_are_ordered_by_score(self):
+        scores = [p['sustainability_score'] for p in self.client.get('/api/dashboard/?top=10').data['top_products']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_catalog_write_invalidates_cached_sections(self):
+        self.client.get('/api/dashboard/')
+        Product.objects.filter(pk=Product.objects.order_by('id').first().pk).delete()
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.data['summary']['total_products'], 39)
+
+
+class ConcurrentAddItemTests(TransactionTestCase):
+    """Adds en paralelo sobre la misma lista no deben perder incrementos"""
+
+    THREADS = 16
+    ADDS_PER_PRODUCT = 300
+
+    def setUp(self):
+        for alias in ('default', 'responses', 'fragments'):
+            caches[alias].clear()
+        self.products = seed_catalog(6)
+        self.shopping_list = ShoppingList.objects.create(name='Concurrente')
+
+    def test_parallel_adds_keep_exact_totals(self):
+        url = f'/api/shopping-lists/{self.shopping_list.id}/add_item/'
+        jobs = [
+            (product.id, 1 + i % 3)
+            for product in self.products
+            for i in range(self.ADDS_PER_PRODUCT // len(self.products))
+        ]
+        errors = []
+
+        def add(job):
+            product_id, quantity = job
+            try:
+                response = APIClient().post(url, {'product_id': product_id, 'quantity': quantity}, format='json')
+                if response.status_code != 201:
+                    errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            list(pool.map(add, jobs))
+
+        self.assertEqual(errors, [])
+
+        expected_quantities = {}
+        for product_id, quantity in jobs:
+            expected_quantities[product_id] = expected_quantities.get(product_id, 0) + quantity
+        items = ShoppingListItem.objects.filter(shopping_list=self.shopping_list)
+        self.assertEqual({item.product_id: item.quantity for item in items}, expected_quantities)
+
+        prices = {product.id: product.price for product in self.products}
+        shopping_list = ShoppingList.objects.get(pk=self.shopping_list.pk)
+        self.assertEqual(shopping_list.total_items, sum(quantity for _, quantity in jobs))
+        self.assertEqual(
+            shopping_list.total_price,
+            sum(prices[product_id] * quantity for product_id, quantity in jobs),
+        )
+        self.assertEqual(shopping_list.score_count, len(self.products))
+        self.assertEqual(ShoppingList.objects.refresh(dry_run=True), [])
+
+
+class OptimizeQueryBudgetTests(TestCase):
+    """POST /api/shopping-lists/optimize/ carga los productos con una sola consulta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(100)
+        SustainabilityScore.objects.filter(product=cls.products[0]).delete()
+
+    def test_pre_solve_uses_one_query(self):
+        items = [{'product_id': product.id, 'quantity': 1} for product in self.products]
+        items += [{'product_id': self.products[1].id, 'quantity': 2}, {'product_id': 999999}]
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/api/shopping-lists/optimize/',
+                {'items': items, 'budget': 50000},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        original = {item['product_id']: item for item in response.data['original_list']}
+        self.assertEqual(len(original), 100)
+        self.assertEqual(original[self.products[1].id]['quantity'], 3)
+        self.assertEqual(original[self.products[0].id]['sustainability_score'], 50)
+        self.assertEqual(response.data['not_found'], [999999])
+
+    def test_invalid_items_are_rejected(self):
+        for items in ([{'product_id': 'x'}], [{'quantity': 1}], [{'product_id': self.products[0].id, 'quantity': 0}]):
+            with self.assertNumQueries(0):
+                response = self.client.post(
+                    '/api/shopping-lists/optimize/',
+                    {'items': items, 'budget': 50000},
+                    content_type='application/json',
+                )
+            self.assertEqual(response.status_code, 400)
+
+
+class AlternativesTests(TestCase):
+    """Alternativas materializadas vs. cálculo en vivo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: la reconstrucción queda para después del commit, que
+        # en TestCase no ocurre, así que la tabla está vacía
+        cls.products = seed_catalog(30)
+
+    def setUp(self):
+        for alias in ('default', 'responses', 'fragments'):
+            caches[alias].clear()
+
+    def _materialized(self):
+        result = {}
+        for product_id, alternative_id in ProductAlternative.objects.order_by('product_id', 'position').values_list(
+            'product_id', 'alternative_id'
+        ):
+            result.setdefault(product_id, []).append(alternative_id)
+        return result
+
+    def test_single_and_batch_endpoints_agree(self):
+        product_ids = [product.id for product in self.products]
+        batch = self.client.post(
+            '/api/products/alternatives-batch/',
+            {'product_ids': product_ids},
+            content_type='application/json',
+        ).data['results']
+
+        self.assertFalse(ProductAlternative.objects.exists())
+        self.assertTrue(any(batch.values()))
+        for product_id in product_ids:
+            single = self.client.get(f'/api/products/{product_id}/alternatives/').data['alternatives']
+            self.assertEqual(
+                [item['id'] for item in single],
+                [item['id'] for item in batch.get(str(product_id), [])],
+            )
+
+    def _batch(self, product_ids):
+        response = self.client.post(
+            '/api/products/alternatives-batch/', {'product_ids': product_ids}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_batch_query_count_does_not_depend_on_the_batch_size(self):
+        # Existencia, tabla materializada, ranking en vivo de los faltantes y carga
+        product_ids = [product.id for product in self.products]
+        with_alternatives = list(rank_alternatives(product_ids))
+        for ids in (with_alternatives[:1], product_ids):
+            with self.subTest(size=len(ids)), self.assertNumQueries(4):
+                self._batch(ids)
+
+        rebuild_alternatives()
+        with_rows = list(ProductAlternative.objects.values_list('product_id', flat=True).distinct())
+        # Sin faltantes no hace falta el ranking en vivo
+        for ids in (with_rows[:1], with_rows):
+            with self.subTest(size=len(ids), materialized=True), self.assertNumQueries(3):
+                self._batch(ids)
+
+    def test_bulk_reprice_rebuilds_materialized_alternatives(self):
+        rebuild_alternatives()
+        product = self.products[0]
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Product.objects.filter(pk=product.pk).update(price=1)
+        self.assertTrue(callbacks)
+
+        expected = rank_alternatives(p.id for p in self.products)
+        self.assertEqual(self._materialized(), expected)
+        self.assertNotIn(product.id, self._materialized())
+
+
+class IncrementalAlternativesTests(TestCase):
+    """Un save() reconstruye solo las filas afectadas, con el mismo resultado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(120)
+
+    def setUp(self):
+        rebuild_alternatives()
+
+    def _rows(self):
+        return dict(ProductAlternative.objects.values_list('pk', 'product_id'))
+
+    def _assert_matches_live(self):
+        materialized = {}
+        for product_id, alternative_id in ProductAlternative.objects.order_by('product_id', 'position').values_list(
+            'product_id', 'alternative_id'
+        ):
+            materialized.setdefault(product_id, []).append(alternative_id)
+        self.assertEqual(materialized, rank_alternatives(Product.objects.values_list('id', flat=True)))
+
+    def _save(self, product, **changes):
+        for field, value in changes.items():
+            setattr(product, field, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+    def test_saves_keep_the_table_equal_to_the_live_ranking(self):
+        product = Product.objects.get(pk=self.products[12].pk)
+        changes = [
+            {'price': 100},
+            {'sustainability_score': 100},
+            {'sustainability_score': None},
+            {'price': 9000, 'sustainability_score': 55},
+            {'category': 'bebidas'},
+        ]
+        for change in changes:
+            with self.subTest(change=change):
+                self._save(product, **change)
+                self._assert_matches_live()
+
+    def test_delete_rebuilds_the_products_that_listed_it(self):
+        product = Product.objects.get(pk=self.products[7].pk)
+        self.assertTrue(ProductAlternative.objects.filter(alternative=product).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self._assert_matches_live()
+
+    def test_save_does_not_rebuild_the_whole_category(self):
+        # Un producto que no es alternativa de nadie: solo cambian sus filas
+        product = Product.objects.exclude(
+            id__in=ProductAlternative.objects.values('alternative_id')
+        ).order_by('id').first()
+        before = self._rows()
+        same_category = set(Product.objects.filter(category=product.category).values_list('id', flat=True))
+
+        self._save(product, price=product.price + 1)
+
+        after = self._rows()
+        rebuilt = {source for pk, source in before.items() if after.get(pk) != source}
+        self.assertEqual(rebuilt, {product.id})
+        self.assertGreater(len(same_category), 1)
+        self._assert_matches_live()
+
+
+class SimilarityIndexSyncTests(TestCase):
+    """El índice en memoria se pone al día con la versión del catálogo"""
+
+    def setUp(self):
+        similarity_service.reload()
+        self.addCleanup(similarity_service.reload)
+        self.products = seed_catalog(20)
+
+    def _similar_batch(self, product_ids):
+        return self.client.post(
+            '/api/products/similar-batch/',
+            {'product_ids': product_ids, 'limit': 50},
+            content_type='application/json',
+        ).data
+
+    def test_bulk_created_products_are_indexed(self):
+        self._similar_batch([self.products[0].id])
+        (new,) = Product.objects.bulk_create([
+            Product(barcode='7809999999999', name='Producto nuevo', brand='Marca 1',
+                    category='granos', price=900, weight=500),
+        ])
+
+        data = self._similar_batch([new.id, self.products[0].id])
+        self.assertEqual(data['not_found'], [])
+        self.assertIn(new.id, [item['id'] for item in data['results'][str(self.products[0].id)]])
+
+    def test_queryset_deletes_leave_the_index(self):
+        self._similar_batch([self.products[0].id])
+        deleted = self.products[1].id
+        Product.objects.filter(pk=deleted).delete()
+
+        data = self._similar_batch([deleted, self.products[0].id])
+        self.assertEqual(data['not_found'], [deleted])
+        self.assertNotIn(deleted, [item['id'] for item in data['results'][str(self.products[0].id)]])
+
+
+class SustainabilityScoreBulkSyncTests(TestCase):
+    """Las escrituras masivas de scores sincronizan Product y suben la versión"""
+
+    def setUp(self):
+        for alias in ('default', 'responses', 'fragments'):
+            caches[alias].clear()
+        self.products = seed_catalog(4)
+
+    def assertSynced(self, product):
+        score = SustainabilityScore.objects.filter(product=product).values_list('total_score', flat=True).first()
+        product.refresh_from_db()
+        self.assertEqual(product.sustainability_score, score)
+
+    def assertBumps(self, write):
+        before = get_catalog_version()
+        write()
+        self.assertGreater(get_catalog_version(), before)
+
+    def test_queryset_update(self):
+        product = self.products[0]
+        self.assertBumps(lambda: SustainabilityScore.objects.filter(product=product).update(total_score=77))
+        self.assertSynced(product)
+        self.assertEqual(product.sustainability_score, 77)
+
+    def test_bulk_update(self):
+        score = SustainabilityScore.objects.get(product=self.products[1])
+        score.total_score = 12
+        self.assertBumps(lambda: SustainabilityScore.objects.bulk_update([score], ['total_score']))
+        self.assertSynced(self.products[1])
+
+    def test_queryset_delete(self):
+        product = self.products[2]
+        self.assertBumps(lambda: SustainabilityScore.objects.filter(product=product).delete())
+        self.assertSynced(product)
+        self.assertIsNone(product.sustainability_score)
+
+        listed = self.client.get(f'/api/products/?fields=id,sustainability_score&category={product.category}').data
+        row = next(item for item in listed['results'] if item['id'] == product.id)
+        self.assertIsNone(row['sustainability_score'])
+
+    def test_bulk_create(self):
+        product = self.products[3]
+        SustainabilityScore.objects.filter(product=product).delete()
+        self.assertBumps(lambda: SustainabilityScore.objects.bulk_create([
+            SustainabilityScore(product=product, economic_score=10, environmental_score=20,
+                                social_score=30, total_score=40),
+        ]))
+        self.assertSynced(product)
+
+
+class ResponseCacheTests(TestCase):
+    """Respuestas cacheadas por versión del catálogo (X-Cache)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(24)
+
+    def setUp(self):
+        for alias in ('default', 'responses', 'fragments'):
+            caches[alias].clear()
+
+    def test_miss_then_hit(self):
+        first = self.client.get('/api/products/?ordering=price')
+        second = self.client.get('/api/products/?ordering=price')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+
+    def test_catalog_write_invalidates(self):
+        self.client.get('/api/products/?ordering=price')
+        cheapest = self.products[5]
+        Product.objects.filter(pk=cheapest.pk).update(price=1)
+
+        response = self.client.get('/api/products/?ordering=price')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['id'], cheapest.id)
+
+    def test_category_queries_use_the_category_version(self):
+        url = '/api/products/?category=granos'
+        self.client.get(url)
+
+        other = Product.objects.exclude(category='granos').first()
+        Product.objects.filter(pk=other.pk).update(price=2)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        same = Product.objects.filter(category='granos').first()
+        Product.objects.filter(pk=same.pk).update(price=3)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_alternatives_rebuild_invalidates_reads_before_it(self):
+        rebuild_alternatives()
+        target = max((p for p in self.products if p.category == 'granos'), key=lambda p: p.price)
+        # La última alternativa pasa a ser la primera
+        candidate = Product.objects.get(pk=rank_alternatives([target.pk])[target.pk][-1])
+        url = f'/api/products/{target.pk}/alternatives/'
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            candidate.sustainability_score = 100
+            candidate.save()
+        # Lectura entre el commit (versión nueva) y la reconstrucción
+        stale = self.client.get(url)
+        self.assertEqual(stale['X-Cache'], 'MISS')
+        self.assertNotEqual(stale.json()['alternatives'][0]['id'], candidate.pk)
+
+        for callback in callbacks:
+            callback()
+        fresh = self.client.get(url)
+        self.assertEqual(fresh['X-Cache'], 'MISS')
+        self.assertEqual(
+            [item['id'] for item in fresh.json()['alternatives']],
+            rank_alternatives([target.pk])[target.pk],
+        )
+        self.assertEqual(fresh.json()['alternatives'][0]['id'], candidate.pk)
+
+
+class FragmentCacheTests(TestCase):
+    """Fragmentos por producto, invalidados por updated_at y calculated_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(10)
+
+    def setUp(self):
+        caches['fragments'].clear()
+        fragment_stats.reset()
+
+    def _serialize(self, products=None):
+        if products is None:
+            products = list(Product.objects.select_related('sustainability').order_by('id'))
+        return ProductListSerializer(products, many=True).data
+
+    def test_second_pass_hits_every_fragment(self):
+        first = self._serialize()
+        second = self._serialize()
+        self.assertEqual(first, second)
+        self.assertEqual(fragment_stats.snapshot()['misses'], 10)
+        self.assertEqual(fragment_stats.snapshot()['hits'], 10)
+
+    def test_updated_at_change_reserializes_the_product(self):
+        self._serialize()
+        product = Product.objects.order_by('id').first()
+        Product.objects.filter(pk=product.pk).update(name='Renombrado')
+        fragment_stats.reset()
+
+        data = self._serialize()
+        self.assertEqual(data[0]['name'], 'Renombrado')
+        self.assertEqual(fragment_stats.snapshot(), {'hits': 9, 'misses': 1, 'hit_rate': 0.9})
+
+    def test_calculated_at_change_reserializes_the_product(self):
+        products = list(Product.objects.select_related('sustainability').order_by('id'))
+        self._serialize(products)
+        score = products[3].sustainability
+        score.calculated_at = score.calculated_at + timedelta(seconds=1)
+        fragment_stats.reset()
+
+        self._serialize(products)
+        self.assertEqual(fragment_stats.snapshot()['misses'], 1)
+
+    def test_deferred_updated_at_skips_the_cache(self):
+        products = list(Product.objects.select_related('sustainability').defer('updated_at').order_by('id'))
+        self._serialize(products)
+        self._serialize(products)
+        self.assertEqual(fragment_stats.snapshot()['hits'], 0)
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified en el detalle de productos y listas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(6)
+
+    def setUp(self):
+        for alias in ('default', 'responses', 'fragments'):
+            caches[alias].clear()
+        self.shopping_list = ShoppingList.objects.create(name='Semana')
+        ShoppingListItem.objects.add_quantity(self.shopping_list.id, self.products[0], 1)
+
+    def _assert_conditional(self, url, write):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        write()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_detail(self):
+        product = self.products[2]
+        self._assert_conditional(
+            f'/api/products/{product.id}/',
+            lambda: Product.objects.filter(pk=product.pk).update(price=999),
+        )
+
+    def test_shopping_list_detail(self):
+        self._assert_conditional(
+            f'/api/shopping-lists/{self.shopping_list.id}/',
+            lambda: self.client.post(
+                f'/api/shopping-lists/{self.shopping_list.id}/add_item/',
+                {'product_id': self.products[1].id, 'quantity': 2},
+                content_type='application/json',
+            ),
+        )
+
+
+class ExportTests(TestCase):
+    """Exportación en streaming: negociación de formato, since y snapshot"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(8)
+
+    def _export(self, params=''):
+        response = self.client.get(f'/api/products/export/{params}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_by_default(self):
+        response, body = self._export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], sorted(p.id for p in self.products))
+        self.assertEqual(rows[0]['price'], str(Product.objects.get(pk=rows[0]['id']).price))
+
+    def test_csv_format(self):
+        response, body = self._export('?format=csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), len(self.products))
+        self.assertEqual(set(rows[0]), set(EXPORT_FIELDS))
+
+    def test_invalid_format(self):
+        response = self.client.get('/api/products/export/?format=xml')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_since_filters_by_updated_at(self):
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        changed = self.products[4]
+        Product.objects.filter(pk=changed.pk).update(name='Cambiado')
+        since = (timezone.now() - timedelta(hours=1)).isoformat()
+
+        _, body = self._export(f'?since={quote(since)}')
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [changed.id])
+
+    def test_snapshot_leaves_the_settle_window(self):
+        before = timezone.now()
+        response, _ = self._export()
+        snapshot = parse_since(response['X-Export-Snapshot'])
+        self.assertLessEqual(snapshot, before - SETTLE_DELAY + timedelta(seconds=1))
+        self.assertGreaterEqual(snapshot, before - SETTLE_DELAY)
+
+
+@patch('api.services.changes.SETTLE_DELAY', timedelta(0))
+class ChangesFeedTests(TestCase):
+    """Sincronización incremental: upserts, tombstones y cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(7)
+
+    def _changes(self, params):
+        response = self.client.get('/api/products/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _drain(self, cursor=None, limit=3):
+        results, batches = [], 0
+        params = {'limit': limit}
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            page = self._changes(params)
+            results += page['results']
+            cursor = page['next_cursor']
+            batches += 1
+            if not page['has_more']:
+                return results, cursor, batches
+
+    def test_cursor_walks_the_whole_catalog_once(self):
+        results, cursor, batches = self._drain()
+        self.assertEqual(sorted(r['id'] for r in results), sorted(p.id for p in self.products))
+        self.assertEqual({r['type'] for r in results}, {'upsert'})
+        self.assertEqual(batches, 3)
+        self.assertIsNotNone(cursor)
+
+    def test_continuation_returns_updates_and_tombstones(self):
+        _, cursor, _ = self._drain()
+        self.assertEqual(self._changes({'cursor': cursor})['results'], [])
+
+        updated, deleted = self.products[1], self.products[2]
+        Product.objects.filter(pk=updated.pk).update(name='Nuevo nombre')
+        Product.objects.filter(pk=deleted.pk).delete()
+
+        results, _, _ = self._drain(cursor)
+        self.assertEqual(
+            [(r['type'], r['id']) for r in results],
+            [('upsert', updated.id), ('delete', deleted.id)],
+        )
+        self.assertEqual(results[0]['product']['name'], 'Nuevo nombre')
+        self.assertEqual(results[1]['barcode'], deleted.barcode)
+
+    def test_since_includes_changes_at_the_instant(self):
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        since = timezone.now() - timedelta(hours=1)
+        Product.objects.filter(pk=self.products[0].pk).update(price=10)
+
+        page = self._changes({'since': since.isoformat()})
+        self.assertEqual([r['id'] for r in page['results']], [self.products[0].id])
+        self.assertFalse(page['has_more'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/changes/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangesSettleDelayTests(TestCase):
+
+    def test_recent_changes_wait_for_the_settle_delay(self):
+        seed_catalog(3)
+        response = self.client.get('/api/products/changes/')
+        self.assertEqual(response.json()['results'], [])
+
+        Product.objects.update(updated_at=timezone.now() - SETTLE_DELAY - timedelta(seconds=1))
+        response = self.client.get('/api/products/changes/')
+        self.assertEqual(len(response.json()['results']), 3)
+
+
+class ShoppingListTotalsTests(TestCase):
+    """Totales incrementales de las listas (deltas por item y refresh)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(6)
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(name='Totales')
+
+    def _totals(self):
+        shopping_list = ShoppingList.objects.get(pk=self.shopping_list.pk)
+        return {field: getattr(shopping_list, field) for field in ('total_price', 'total_items', 'score_count', 'average_score')}
+
+    def _expected(self, quantities):
+        products = {product.id: product for product in self.products}
+        scores = [products[pid].sustainability_score for pid in quantities]
+        return {
+            'total_price': sum(products[pid].price * quantity for pid, quantity in quantities.items()),
+            'total_items': sum(quantities.values()),
+            'score_count': len(scores),
+            'average_score': sum(scores) / len(scores) if scores else 0,
+        }
+
+    def _assert_totals(self, quantities):
+        totals, expected = self._totals(), self._expected(quantities)
+        self.assertEqual(totals['total_price'], expected['total_price'])
+        self.assertEqual(totals['total_items'], expected['total_items'])
+        self.assertEqual(totals['score_count'], expected['score_count'])
+        self.assertAlmostEqual(totals['average_score'], expected['average_score'])
+        self.assertEqual(ShoppingList.objects.refresh([self.shopping_list.pk], dry_run=True), [])
+
+    def test_add_item(self):
+        a, b = self.products[1], self.products[2]
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 2)
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, b, 1)
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 3)
+        self._assert_totals({a.id: 5, b.id: 1})
+
+    def test_quantity_change(self):
+        a, b = self.products[1], self.products[2]
+        item, _ = ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 2)
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, b, 1)
+        item = ShoppingListItem.objects.get(pk=item.pk)
+        item.quantity = 7
+        item.save()
+        self._assert_totals({a.id: 7, b.id: 1})
+
+    def test_item_delete(self):
+        a, b = self.products[1], self.products[2]
+        item, _ = ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 2)
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, b, 4)
+        ShoppingListItem.objects.get(pk=item.pk).delete()
+        self._assert_totals({b.id: 4})
+
+        ShoppingListItem.objects.filter(shopping_list=self.shopping_list).get().delete()
+        self._assert_totals({})
+
+    def test_product_reprice_keeps_the_price_at_addition(self):
+        a = self.products[1]
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 3)
+        Product.objects.filter(pk=a.pk).update(price=a.price * 10)
+        self._assert_totals({a.id: 3})
+
+    def test_average_score_uses_score_at_addition(self):
+        # Regresión: el promedio es una foto del score al agregar el item;
+        # recalcular un score no cambia los totales de listas existentes
+        a, b = self.products[1], self.products[2]
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, a, 1)
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, b, 1)
+        SustainabilityScore.objects.filter(product=a).update(total_score=99)
+
+        self._assert_totals({a.id: 1, b.id: 1})
+        self.assertEqual(ShoppingList.objects.refresh(dry_run=True), [])
+
+    def test_refresh_dry_run_reports_drift(self):
+        ShoppingListItem.objects.add_quantity(self.shopping_list.pk, self.products[1], 2)
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(total_price=1, total_items=99)
+
+        self.assertEqual(ShoppingList.objects.refresh(dry_run=True), [self.shopping_list.pk])
+        self.assertEqual(self._totals()['total_items'], 99)
+
+        self.assertEqual(ShoppingList.objects.refresh(), [self.shopping_list.pk])
+        self._assert_totals({self.products[1].id: 2})
+
+
+class ItemsBatchTests(TestCase):
+    """POST /shopping-lists/{id}/items/batch/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(6)
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(name='Lote')
+        self.url = f'/api/shopping-lists/{self.shopping_list.id}/items/batch/'
+        for product in self.products[:3]:
+            ShoppingListItem.objects.add_quantity(self.shopping_list.id, product, 2)
+
+    def _batch(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def _quantities(self):
+        return dict(
+            ShoppingListItem.objects.filter(shopping_list=self.shopping_list).values_list('product_id', 'quantity')
+        )
+
+    def test_add_update_remove(self):
+        p = self.products
+        response = self._batch({
+            'add': [{'product_id': p[0].id, 'quantity': 3}, {'product_id': p[4].id, 'quantity': 1}],
+            'update': [{'product_id': p[1].id, 'quantity': 7}],
+            'remove': [p[2].id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._quantities(), {p[0].id: 5, p[1].id: 7, p[4].id: 1})
+
+        item = ShoppingListItem.objects.get(shopping_list=self.shopping_list, product=p[0])
+        self.assertEqual(item.subtotal, item.price_at_addition * 5)
+
+        shopping_list = ShoppingList.objects.get(pk=self.shopping_list.pk)
+        self.assertEqual(shopping_list.total_items, 13)
+        self.assertEqual(shopping_list.total_price, p[0].price * 5 + p[1].price * 7 + p[4].price)
+        self.assertEqual(shopping_list.score_count, 3)
+        self.assertEqual(response.json()['shopping_list']['total_items'], 13)
+        self.assertEqual(ShoppingList.objects.refresh(dry_run=True), [])
+
+    def test_remove_missing_item(self):
+        before = self._quantities()
+        response = self._batch({
+            'add': [{'product_id': self.products[0].id, 'quantity': 1}],
+            'remove': [self.products[5].id],
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['missing_items'], [self.products[5].id])
+        self.assertEqual(self._quantities(), before)
+
+    def test_error_rolls_back_the_batch(self):
+        before = self._quantities()
+        totals = ShoppingList.objects.values('total_items', 'total_price').get(pk=self.shopping_list.pk)
+
+        with patch.object(ShoppingListItem.objects, 'bulk_create', side_effect=DatabaseError('falla')):
+            with self.assertRaises(DatabaseError):
+                self._batch({
+                    'add': [{'product_id': self.products[0].id, 'quantity': 4}],
+                    'update': [{'product_id': self.products[1].id, 'quantity': 9}],
+                })
+
+        self.assertEqual(self._quantities(), before)
+        self.assertEqual(
+            ShoppingList.objects.values('total_items', 'total_price').get(pk=self.shopping_list.pk), totals
+        )
+
+    def test_batch_touches_the_list_when_totals_do_not_change(self):
+        # Reemplazar un producto por otro con el mismo precio y score no
+        # cambia los totales, pero el detalle sí cambia
+        old, new = self.products[2], self.products[5]
+        Product.objects.filter(pk=new.pk).update(price=old.price)
+        SustainabilityScore.objects.filter(product=new).update(total_score=old.sustainability_score)
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        url = f'/api/shopping-lists/{self.shopping_list.id}/'
+        etag = self.client.get(url)['ETag']
+        response = self._batch({
+            'add': [{'product_id': new.id, 'quantity': 2}],
+            'remove': [old.id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ShoppingListPaginationTests(TestCase):
+    """Índice sin items y paginación por cursor de los items del detalle"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = seed_catalog(5)
+
+    def setUp(self):
+        self.shopping_list = ShoppingList.objects.create(name='Paginada')
+        for product in self.products:
+            ShoppingListItem.objects.add_quantity(self.shopping_list.id, product, 1)
+
+    def test_index_payload_has_totals_without_items(self):
+        response = self.client.get('/api/shopping-lists/')
+        self.assertEqual(response.status_code, 200)
+        entry = next(row for row in response.json()['results'] if row['id'] == self.shopping_list.id)
+        self.assertNotIn('items', entry)
+        self.assertEqual(entry['total_items'], 5)
+        self.assertEqual(
+            set(entry),
+            {'id', 'name', 'budget', 'is_optimized', 'total_price', 'total_items',
+             'average_score', 'created_at', 'updated_at'},
+        )
+
+    def test_items_cursor_keeps_the_page_size(self):
+        response = self.client.get(f'/api/shopping-lists/{self.shopping_list.id}/', {'page_size': 2})
+        data = response.json()
+        seen = [item['id'] for item in data['items']]
+        self.assertEqual(len(seen), 2)
+
+        url = data['items_next']
+        self.assertIn(f'/api/shopping-lists/{self.shopping_list.id}/items/', url)
+        self.assertIn('page_size=2', url)
+
+        pages = []
+        while url:
+            page = self.client.get(url).json()
+            pages.append(len(page['results']))
+            seen += [item['id'] for item in page['results']]
+            url = page['next']
+
+        self.assertEqual(pages, [2, 1])
+        expected = ShoppingListItem.objects.filter(shopping_list=self.shopping_list).order_by('id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
@@ -0,0 +1,119 @@
+"""
+GET condicionales (ETag / Last-Modified) para detalle de recursos
+
+Los validadores se calculan con una consulta liviana (.values()) antes de
+cargar el objeto completo. Si el cliente envía If-None-Match o
+If-Modified-Since y el recurso no cambió, se responde 304 sin serializar
+ni ejecutar los prefetch del detalle.
+"""
+
+import hashlib
+from functools import wraps
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from api.models.product import Product
+from api.models.shopping import ShoppingList
+from api.services.catalog_version import get_catalog_version
+from api.views.response_cache import normalize_query_params
+
+
+def _make_etag(request, *parts) -> str:
+    # La representación también depende de ?fields= y del formato negociado
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = (*parts, normalize_query_params(request.query_params), getattr(renderer, 'format', ''))
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else ''
+
+
+def product_validators(request, pk):
+    """
+    (etag, last_modified) de un producto: updated_at, calculated_at del
+    score y versión del catálogo de su categoría. None si no existe.
+    """
+    try:
+        row = (
+            Product.objects
+            .filter(pk=pk)
+            .values('category', 'updated_at', 'sustainability__calculated_at')
+            .first()
+        )
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+
+    calculated_at = row['sustainability__calculated_at']
+    version = get_catalog_version(row['category'], request=request)
+    etag = _make_etag(
+        request, 'product', pk,
+        _isoformat(row['updated_at']), _isoformat(calculated_at), version,
+    )
+    last_modified = max(value for value in (row['updated_at'], calculated_at) if value is not None)
+    return etag, last_modified
+
+
+def shopping_list_validators(request, pk):
+    """
+    (etag, last_modified) de una lista: su updated_at y el último cambio
+    de los productos que contiene (se incluyen anidados en la respuesta).
+    """
+    try:
+        row = (
+            ShoppingList.objects
+            .filter(pk=pk)
+            .annotate(products_updated_at=Max('items__product__updated_at'))
+            .values('updated_at', 'products_updated_at')
+            .first()
+        )
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+
+    etag = _make_etag(
+        request, 'shopping-list', pk,
+        _isoformat(row['updated_at']), _isoformat(row['products_updated_at']),
+    )
+    last_modified = max(
+        value for value in (row['updated_at'], row['products_updated_at']) if value is not None
+    )
+    return etag, last_modified
+
+
+def conditional_get(validators):
+    """
+    Decorador para acciones de detalle (GET con pk).
+
+    Args:
+        validators: función (request, pk) -> (etag, last_modified) o None
+
+    Si el recurso no existe se delega en la acción (que responde 404).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+
+            result = validators(request, kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+            if result is None:
+                return method(self, request, *args, **kwargs)
+
+            etag, last_modified = result
+            timestamp = int(last_modified.timestamp())
+            conditional = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if conditional is not None:
+                return conditional
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from api.services.dashboard import (
+    DASHBOARD_MAX_ITEMS,
+    DASHBOARD_RECENT_LISTS,
+    DASHBOARD_TOP_PRODUCTS,
+    build_dashboard,
+)
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    ViewSet del dashboard.
+    
+    Endpoints:
+    - GET /api/dashboard/ - Resumen, productos destacados y listas recientes
+    """
+    
+    def list(self, request):
+        """
+        Query params:
+        - top: cantidad de productos destacados (por defecto 5, máximo 20)
+        - lists: cantidad de listas recientes (por defecto 5, máximo 20)
+        """
+        try:
+            top = int(request.query_params.get('top', DASHBOARD_TOP_PRODUCTS))
+            lists = int(request.query_params.get('lists', DASHBOARD_RECENT_LISTS))
+        except ValueError:
+            return Response(
+                {'error': 'top y lists deben ser enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        top = max(0, min(top, DASHBOARD_MAX_ITEMS))
+        lists = max(0, min(lists, DASHBOARD_MAX_ITEMS))
+        return Response(build_dashboard(request, top=top, lists=lists))
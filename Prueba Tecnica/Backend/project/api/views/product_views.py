@@ -1,11 +1,42 @@
 from decimal import Decimal
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from django.db.models import F, Q
 from api.models.product import Product
 from api.serializers import ProductSerializer, ProductListSerializer
+from api.serializers.product_serializer import ProductDetailedEnvironmentalSerializer
+from api.serializers.sparse_fields import parse_field_list
+from api.serializers.fast_list import FastProductListSerializer
 from api.services.openfoodfacts import openfoodfacts_service
+from api.services.facets import get_facets
+from api.services.alternatives import resolve_alternative_ids
+from api.services.similarity import similarity_service
+from api.services.export import EXPORT_FORMATS, csv_stream, export_rows, ndjson_stream, parse_since
+from api.services.changes import (
+    CHANGES_DEFAULT_LIMIT,
+    CHANGES_MAX_LIMIT,
+    SETTLE_DELAY,
+    decode_cursor,
+    get_changes,
+    since_position,
+)
+from api.views.response_cache import cache_catalog_response
+from api.views.conditional import conditional_get, product_validators
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    En /export/ el parámetro ?format= elige el formato del archivo, no un
+    renderer de DRF; los errores se responden siempre en JSON.
+    """
+    
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -13,21 +44,80 @@ class ProductViewSet(viewsets.ModelViewSet):
     ViewSet para gestión de productos.
     
     Endpoints:
-    - GET /api/products/ - Lista todos los productos
-    - GET /api/products/{id}/ - Detalle de un producto
+    - GET /api/products/ - Lista todos los productos (?ordering=)
+    
+    Listado, search y alternatives se sirven desde la caché de respuestas
+    (ligada a la versión del catálogo) con header X-Cache: HIT/MISS.
+    
+    Listado, detalle y búsqueda aceptan ?fields=a,b / ?exclude=c y solo
+    leen de la base de datos las columnas necesarias para esos campos.
+    - GET /api/products/{id}/ - Detalle de un producto (ETag / Last-Modified)
     - GET /api/products/search/ - Búsqueda de productos
+    - GET /api/products/facets/ - Conteos por faceta para los filtros actuales
+    - GET /api/products/{id}/ecoscore-details/ - JSON completo del Eco-Score
     - GET /api/products/{id}/alternatives/ - Alternativas a un producto
+    - POST /api/products/alternatives-batch/ - Alternativas para varios productos
+    - GET /api/products/{id}/similar/ - Productos similares por características
+    - POST /api/products/similar-batch/ - Similares para varios productos
     - POST /api/products/scan/ - Escanear código de barras
+    - POST /api/products/bulk/ - Resolver muchos productos por id y/o código de barras
+    - GET /api/products/export/?format=ndjson|csv - Catálogo completo en streaming
+    - GET /api/products/changes/?since=&cursor= - Cambios y eliminaciones desde un instante
     """
     queryset = Product.objects.all().select_related('sustainability')
     serializer_class = ProductSerializer
     
+    # Valores aceptados en ?ordering= -> columnas indexadas de Product.
+    # Se agrega 'id' como desempate para que la paginación sea estable.
+    # Las columnas nullable dejan los productos sin dato al final en ambos
+    # sentidos (SQLite los pone primero en ASC); SQLite sigue usando el
+    # índice con NULLS LAST.
+    ORDERING_OPTIONS = {
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'price_per_unit': (F('price_per_unit').asc(nulls_last=True), 'id'),
+        '-price_per_unit': (F('price_per_unit').desc(nulls_last=True), '-id'),
+        'sustainability_score': (F('sustainability_score').asc(nulls_last=True), 'id'),
+        '-sustainability_score': (F('sustainability_score').desc(nulls_last=True), '-id'),
+        'carbon_footprint': (F('carbon_footprint').asc(nulls_last=True), 'id'),
+        '-carbon_footprint': (F('carbon_footprint').desc(nulls_last=True), '-id'),
+        'newest': ('-created_at', '-id'),
+    }
+    
+    # Acciones de lectura en las que se aplica .only() según ?fields=/?exclude=
+    SPARSE_ACTIONS = ('list', 'retrieve')
+    
+    # Máximo de productos aceptados por las acciones batch
+    MAX_BATCH_SIZE = 500
+    
+    # Máximo de claves (ids + códigos de barras) en /bulk/
+    MAX_BULK_LOOKUP = 5000
+    
+    # Cantidad de similares por defecto / máxima (?limit=)
+    SIMILAR_DEFAULT_LIMIT = 5
+    SIMILAR_MAX_LIMIT = 50
+    
     def get_serializer_class(self):
         """Usa serializer ligero para listas"""
         if self.action == 'list':
             return ProductListSerializer
         return ProductSerializer
     
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        """Listado paginado; las filas se serializan con FastProductListSerializer"""
+        fast = self._fast_list_serializer()
+        queryset = fast.prepare(self.filter_queryset(self.get_queryset()))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
+    
+    @conditional_get(product_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     def get_queryset(self):
         """Filtrado de productos"""
         queryset = super().get_queryset()
@@ -50,7 +140,8 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(price__lte=Decimal(max_price))
         
         if min_score:
-            queryset = queryset.filter(sustainability__total_score__gte=float(min_score))
+            # Columna desnormalizada e indexada, evita filtrar sobre el join
+            queryset = queryset.filter(sustainability_score__gte=float(min_score))
         
         if is_organic == 'true':
             queryset = queryset.filter(is_organic=True)
@@ -58,9 +149,40 @@ class ProductViewSet(viewsets.ModelViewSet):
         if is_local == 'true':
             queryset = queryset.filter(is_local=True)
         
+        ordering = self.request.query_params.get('ordering', None)
+        if ordering:
+            if ordering not in self.ORDERING_OPTIONS:
+                raise ValidationError({
+                    'ordering': f'Valor inválido. Opciones: {", ".join(self.ORDERING_OPTIONS)}'
+                })
+            queryset = queryset.order_by(*self.ORDERING_OPTIONS[ordering])
+        
+        if self.action in self.SPARSE_ACTIONS:
+            queryset = self._apply_sparse_fields(queryset, self.get_serializer_class())
+        elif self.action == 'ecoscore_details':
+            queryset = queryset.select_related('ecoscore_details')
+        
         return queryset
     
+    def _fast_list_serializer(self):
+        """Serializador de listados sobre .values_list() según ?fields=/?exclude="""
+        return FastProductListSerializer(
+            parse_field_list(self.request.query_params.get('fields')),
+            parse_field_list(self.request.query_params.get('exclude')),
+        )
+    
+    def _apply_sparse_fields(self, queryset, serializer_class):
+        """Lee solo las columnas que el serializer va a emitir"""
+        columns = serializer_class.required_columns(
+            parse_field_list(self.request.query_params.get('fields')),
+            parse_field_list(self.request.query_params.get('exclude')),
+        )
+        if 'sustainability' in columns:
+            return queryset.select_related('sustainability').only(*columns)
+        return queryset.select_related(None).only(*columns)
+    
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def search(self, request):
         """
         Búsqueda de productos por texto.
@@ -81,43 +203,202 @@ class ProductViewSet(viewsets.ModelViewSet):
             Q(name__icontains=query) |
             Q(brand__icontains=query) |
             Q(category__icontains=query)
-        ).select_related('sustainability')[:20]
-        
-        serializer = ProductListSerializer(products, many=True)
+        )
+        fast = self._fast_list_serializer()
+        products = fast.prepare(products)[:20]
         
         return Response({
             'count': products.count(),
-            'results': serializer.data
+            'results': fast.serialize(products)
         })
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Conteos por faceta para el conjunto filtrado actual.
+        
+        Acepta los mismos filtros que el listado (category, min_price,
+        max_price, min_score, is_organic, is_local). Se calcula en una
+        sola consulta agrupada y se cachea por filtros normalizados.
+        """
+        return Response(get_facets(self.get_queryset(), request.query_params, request=request))
+    
+    @action(detail=True, methods=['get'], url_path='ecoscore-details')
+    def ecoscore_details(self, request, pk=None):
+        """
+        Datos ambientales detallados, incluyendo el JSON completo del Eco-Score.
+        
+        Es el único endpoint que lee ProductEcoscoreData.
+        """
+        product = self.get_object()
+        serializer = ProductDetailedEnvironmentalSerializer(
+            product,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['get'])
+    @cache_catalog_response
     def alternatives(self, request, pk=None):
         """
         Obtiene productos alternativos similares.
         
-        Busca productos en la misma categoría con mejor precio o score.
+        Misma categoría, hasta 20% más caros, ordenados por score de
+        sostenibilidad. Se leen de la tabla precalculada ProductAlternative
+        y, si el producto aún no tiene filas, se calculan en vivo (igual que
+        alternatives-batch).
         """
         product = self.get_object()
+        alternative_ids = resolve_alternative_ids([product.id]).get(product.id, [])
+        products = Product.objects.select_related('sustainability').in_bulk(alternative_ids)
+        alternatives = [products[aid] for aid in alternative_ids if aid in products]
         
-        # Buscar alternativas en la misma categoría
-        alternatives = Product.objects.filter(
-            category=product.category
-        ).exclude(
-            id=product.id
-        ).select_related('sustainability')
+        serializer = ProductListSerializer(alternatives, many=True)
         
-        # Filtrar por precio similar o mejor
-        max_price = float(product.price) * 1.2  # Hasta 20% más caro
-        alternatives = alternatives.filter(price__lte=max_price)
+        return Response({
+            'product': ProductSerializer(product).data,
+            'alternatives': serializer.data
+        })
+    
+    @action(detail=False, methods=['post'], url_path='alternatives-batch')
+    def alternatives_batch(self, request):
+        """
+        Alternativas para varios productos en una sola llamada.
         
-        # Ordenar por score de sostenibilidad
-        alternatives = alternatives.order_by('-sustainability__total_score')[:5]
+        Body:
+        {
+            "product_ids": [1, 2, 3]
+        }
+        """
+        product_ids = request.data.get('product_ids')
         
-        serializer = ProductListSerializer(alternatives, many=True)
+        if not isinstance(product_ids, list) or not product_ids:
+            return Response(
+                {'error': 'product_ids debe ser una lista no vacía'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(product_ids) > self.MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'Máximo {self.MAX_BATCH_SIZE} productos por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            product_ids = list(dict.fromkeys(int(pid) for pid in product_ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'product_ids debe contener enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Consultas fijas: existencia, ranking (tabla + ventana para faltantes)
+        # y carga de las alternativas; se serializa cada producto una sola vez
+        existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        alternative_ids = resolve_alternative_ids(pid for pid in product_ids if pid in existing)
+        
+        unique_ids = {aid for ids in alternative_ids.values() for aid in ids}
+        products = Product.objects.select_related('sustainability').in_bulk(unique_ids)
+        serialized = dict(zip(
+            products,
+            ProductListSerializer(list(products.values()), many=True).data
+        ))
+        
+        return Response({
+            'results': {
+                str(pid): [serialized[aid] for aid in alternative_ids.get(pid, []) if aid in serialized]
+                for pid in product_ids
+                if pid in existing
+            },
+            'not_found': [pid for pid in product_ids if pid not in existing],
+        })
+    
+    def _similar_limit(self, value):
+        try:
+            limit = int(value) if value is not None else self.SIMILAR_DEFAULT_LIMIT
+        except (TypeError, ValueError):
+            raise ValidationError({'limit': 'Debe ser un entero'})
+        return max(1, min(limit, self.SIMILAR_MAX_LIMIT))
+    
+    def _serialize_similar(self, similar):
+        """Serializa {id: [(similar_id, similarity)]} con una sola consulta"""
+        similar_ids = {sid for pairs in similar.values() for sid, _ in pairs}
+        products = Product.objects.select_related('sustainability').in_bulk(similar_ids)
+        serialized = {
+            pid: data
+            for pid, data in zip(
+                products,
+                ProductListSerializer(list(products.values()), many=True).data
+            )
+        }
+        return {
+            pid: [
+                {**serialized[sid], 'similarity': similarity}
+                for sid, similarity in pairs
+                if sid in serialized
+            ]
+            for pid, pairs in similar.items()
+        }
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Productos similares según su vector de características.
+        
+        A diferencia de alternatives, considera nombre, scores, huella,
+        precio por kg, peso y certificaciones además de la categoría.
+        
+        Query params:
+        - limit: cantidad de resultados (default 5, máx 50)
+        """
+        product = self.get_object()
+        limit = self._similar_limit(request.query_params.get('limit'))
+        similar = similarity_service.similar([product.id], limit)
         
         return Response({
             'product': ProductSerializer(product).data,
-            'alternatives': serializer.data
+            'similar': self._serialize_similar(similar).get(product.id, []),
+        })
+    
+    @action(detail=False, methods=['post'], url_path='similar-batch')
+    def similar_batch(self, request):
+        """
+        Productos similares para varios productos en una sola llamada.
+        
+        Body:
+        {
+            "product_ids": [1, 2, 3],
+            "limit": 5
+        }
+        """
+        product_ids = request.data.get('product_ids')
+        
+        if not isinstance(product_ids, list) or not product_ids:
+            return Response(
+                {'error': 'product_ids debe ser una lista no vacía'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(product_ids) > self.MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'Máximo {self.MAX_BATCH_SIZE} productos por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            product_ids = list(dict.fromkeys(int(pid) for pid in product_ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'product_ids debe contener enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        limit = self._similar_limit(request.data.get('limit'))
+        results = self._serialize_similar(similarity_service.similar(product_ids, limit))
+        
+        return Response({
+            'results': {str(pid): results[pid] for pid in product_ids if pid in results},
+            'not_found': [pid for pid in product_ids if pid not in results],
         })
     
     @action(detail=False, methods=['post'])
@@ -168,4 +449,173 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response({
             'found': False,
             'message': 'Producto no encontrado'
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Resuelve muchos productos en una sola llamada.
+        
+        Body:
+        {
+            "ids": [1, 2, 3],
+            "barcodes": ["7802900000001"],
+            "detail": false
+        }
+        
+        Hace una consulta por tipo de clave y serializa cada producto una
+        sola vez. Por defecto usa el serializer ligero de listados; con
+        "detail": true usa el serializer completo. Cada clave de entrada
+        aparece en la respuesta, con "found": false si no existe.
+        """
+        ids = request.data.get('ids') or []
+        barcodes = request.data.get('barcodes') or []
+        
+        if not isinstance(ids, list) or not isinstance(barcodes, list):
+            return Response(
+                {'error': 'ids y barcodes deben ser listas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not ids and not barcodes:
+            return Response(
+                {'error': 'Se requiere al menos un id o código de barras'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(ids) + len(barcodes) > self.MAX_BULK_LOOKUP:
+            return Response(
+                {'error': f'Máximo {self.MAX_BULK_LOOKUP} claves por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            ids = list(dict.fromkeys(int(pid) for pid in ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'ids debe contener enteros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(barcode, str) for barcode in barcodes):
+            return Response(
+                {'error': 'barcodes debe contener strings'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        barcodes = list(dict.fromkeys(barcodes))
+        
+        queryset = Product.objects.select_related('sustainability')
+        by_id = queryset.in_bulk(ids) if ids else {}
+        by_barcode = queryset.in_bulk(barcodes, field_name='barcode') if barcodes else {}
+        
+        # Un mismo producto puede pedirse por id y por código: se serializa una vez
+        products = {product.id: product for product in [*by_id.values(), *by_barcode.values()]}
+        serializer_class = ProductSerializer if request.data.get('detail') else ProductListSerializer
+        serialized = dict(zip(
+            products,
+            serializer_class(list(products.values()), many=True).data
+        ))
+        
+        def entry(product):
+            if product is None:
+                return {'found': False}
+            return {'found': True, 'product': serialized[product.id]}
+        
+        return Response({
+            'ids': {str(pid): entry(by_id.get(pid)) for pid in ids},
+            'barcodes': {barcode: entry(by_barcode.get(barcode)) for barcode in barcodes},
+            'found': len(products),
+        })
+    
+    @action(detail=False, methods=['get'], content_negotiation_class=ExportContentNegotiation)
+    def export(self, request):
+        """
+        Exporta el catálogo en streaming.
+        
+        Query params:
+        - format: ndjson (por defecto) o csv
+        - since: ISO 8601; solo productos con updated_at >= since
+        - los mismos filtros y ?ordering= que el listado
+        
+        El header X-Export-Snapshot trae el instante en que empezó la
+        exportación menos SETTLE_DELAY (como en /changes/): usarlo como
+        ?since= en la siguiente exportación incremental. Así se vuelven a
+        incluir las filas de transacciones que confirmaron tarde un
+        updated_at anterior; se pueden recibir repetidas, nunca perderse.
+        """
+        export_format = request.query_params.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Formato inválido. Opciones: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        snapshot = timezone.now() - SETTLE_DELAY
+        queryset = self.get_queryset()
+        
+        since = request.query_params.get('since')
+        if since:
+            since = parse_since(since)
+            if since is None:
+                return Response(
+                    {'error': 'since debe ser una fecha ISO 8601'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(updated_at__gte=since)
+        
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by(*(('updated_at', 'id') if since else ('id',)))
+        
+        rows = export_rows(queryset)
+        content_type, extension = EXPORT_FORMATS[export_format]
+        stream = csv_stream(rows) if export_format == 'csv' else ndjson_stream(rows)
+        
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="productos.{extension}"'
+        response['X-Export-Snapshot'] = snapshot.isoformat()
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Sincronización incremental: productos modificados y eliminados.
+        
+        Query params:
+        - since: ISO 8601, cambios con timestamp >= since (primera llamada)
+        - cursor: next_cursor de la respuesta anterior (tiene prioridad)
+        - limit: cambios por lote (por defecto 500, máximo 2000)
+        
+        Sin since ni cursor se recorre el catálogo completo. Cada resultado
+        es {"type": "upsert", "product": {...}} o {"type": "delete",
+        "barcode": ...}. Con has_more=false el cliente está al día y debe
+        guardar next_cursor para la próxima sincronización.
+        """
+        cursor = request.query_params.get('cursor')
+        since = request.query_params.get('since')
+        position = None
+        
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return Response(
+                    {'error': 'cursor inválido'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif since:
+            since = parse_since(since)
+            if since is None:
+                return Response(
+                    {'error': 'since debe ser una fecha ISO 8601'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            position = since_position(since)
+        
+        try:
+            limit = int(request.query_params.get('limit', CHANGES_DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'limit debe ser un entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+        
+        return Response(get_changes(position, limit))
@@ -0,0 +1,101 @@
+"""
+Caché de respuestas para endpoints de solo lectura del catálogo
+
+La clave combina path + query params normalizados + versión del catálogo,
+por lo que cualquier escritura en el catálogo invalida las respuestas sin
+tener que borrarlas. Solo se cachean GET con status 200.
+
+Para evitar estampidas, el primer request que no encuentra la clave toma
+un lock (cache.add) y calcula; los demás esperan a que aparezca el valor.
+"""
+
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from api.services.catalog_version import catalog_cache_key
+
+
+# Segundos que un lock protege el cálculo / máximo que esperan los demás
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def normalize_query_params(query_params) -> str:
+    """'b=2&a=1&a=0' -> 'a=0&a=1&b=2'"""
+    items = [
+        (name, value)
+        for name in sorted(query_params)
+        for value in sorted(query_params.getlist(name))
+    ]
+    return '&'.join(f'{name}={value}' for name, value in items)
+
+
+def _wait_for(cache, key):
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+
+def cache_catalog_response(view_method=None, *, timeout=None, category_param='category'):
+    """
+    Decorador para acciones de ViewSet de solo lectura.
+    
+    Agrega el header X-Cache: HIT/MISS. Si la query trae ?category=, se usa
+    la versión de esa categoría, así cambios en otras no invalidan.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET':
+                return method(self, request, *args, **kwargs)
+            
+            cache = get_response_cache()
+            ttl = timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            key = catalog_cache_key(
+                'response',
+                request.path,
+                normalize_query_params(request.query_params),
+                category=request.query_params.get(category_param) or None,
+                request=request,
+            )
+            
+            lock_key = f'{key}:lock'
+            cached = cache.get(key)
+            owns_lock = False
+            if cached is None:
+                owns_lock = cache.add(lock_key, 1, LOCK_TIMEOUT)
+                if not owns_lock:
+                    # Otro request ya está calculando esta misma respuesta
+                    cached = _wait_for(cache, key)
+            
+            if cached is not None:
+                response = Response(cached)
+                response['X-Cache'] = 'HIT'
+                return response
+            
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, ttl)
+            finally:
+                if owns_lock:
+                    cache.delete(lock_key)
+            
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    
+    if view_method is not None:
+        return decorator(view_method)
+    return decorator
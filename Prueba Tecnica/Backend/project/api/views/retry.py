@@ -0,0 +1,42 @@
+"""
+Reintento de escrituras que chocan con un lock de SQLite
+
+SQLite bloquea la base (o la tabla, con caché compartida) completa
+mientras otra conexión escribe. Una transacción que no consigue el lock
+falla con "database is locked" / "database table is locked" en vez de
+esperar, así que las acciones de escritura concurrentes se reintentan
+completas, con espera creciente y jitter.
+"""
+
+import random
+import time
+from functools import wraps
+from django.db import OperationalError, transaction
+
+
+LOCK_RETRY_ATTEMPTS = 30
+LOCK_RETRY_DELAY = 0.01
+
+
+def _is_lock_error(exc):
+    return 'locked' in str(exc)
+
+
+def retry_on_lock(method):
+    """
+    Decorador para acciones de ViewSet que escriben.
+
+    No reintenta si la acción corre dentro de una transacción externa
+    (ATOMIC_REQUESTS, tests): ahí el rollback lo decide quien la abrió.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return method(self, request, *args, **kwargs)
+            except OperationalError as exc:
+                last_attempt = attempt == LOCK_RETRY_ATTEMPTS - 1
+                if not _is_lock_error(exc) or last_attempt or transaction.get_connection().in_atomic_block:
+                    raise
+                time.sleep(LOCK_RETRY_DELAY * (attempt + 1) * (1 + random.random()))
+    return wrapper
@@ -1,13 +1,28 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
 from api.models.shopping import ShoppingList, ShoppingListItem
 from api.models.product import Product
 from api.serializers.shopping_serializer import (
     ShoppingListSerializer,
     ShoppingListItemSerializer,
+    ShoppingListSummarySerializer,
 )
 from api.algorithms.knapsack import knapsack_multi_objective
+from api.views.conditional import conditional_get, shopping_list_validators
+from api.views.retry import retry_on_lock
+
+
+class ShoppingListItemPagination(CursorPagination):
+    """Items de una lista por cursor (keyset sobre id): costo fijo por página"""
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
 
 
 class ShoppingListViewSet(viewsets.ModelViewSet):
@@ -15,16 +30,34 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     ViewSet para gestión de listas de compras.
     
     Endpoints:
-    - GET /api/shopping-lists/ - Lista todas las listas
+    - GET /api/shopping-lists/ - Lista todas las listas (solo encabezados y totales)
     - POST /api/shopping-lists/ - Crea una nueva lista
-    - GET /api/shopping-lists/{id}/ - Detalle de una lista
+    - GET /api/shopping-lists/{id}/ - Detalle con la primera página de items (ETag / Last-Modified)
+    - GET /api/shopping-lists/{id}/items/?cursor= - Items de la lista, paginados por cursor
     - POST /api/shopping-lists/{id}/add-item/ - Agrega item a lista
     - DELETE /api/shopping-lists/{id}/remove-item/ - Elimina item de lista
+    - POST /api/shopping-lists/{id}/items/batch/ - Agrega, actualiza y elimina items en lote
     - POST /api/shopping-lists/optimize/ - Optimiza una lista de compras
     """
     queryset = ShoppingList.objects.all().prefetch_related('items__product__sustainability')
     serializer_class = ShoppingListSerializer
     
+    # Acciones que no precargan los items: el listado y el detalle (sus
+    # items se paginan aparte) y las que modifican items
+    NO_PREFETCH_ACTIONS = {'list', 'retrieve', 'items', 'add_item', 'remove_item', 'items_batch'}
+    MAX_BATCH_SIZE = 200
+    MAX_OPTIMIZE_ITEMS = 500
+    
+    def get_queryset(self):
+        if self.action in self.NO_PREFETCH_ACTIONS:
+            return ShoppingList.objects.all()
+        return super().get_queryset()
+    
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return ShoppingListSummarySerializer
+        return super().get_serializer_class()
+    
     def create(self, request, *args, **kwargs):
         """Crea una nueva lista de compras"""
         serializer = self.get_serializer(data=request.data)
@@ -33,7 +66,48 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @conditional_get(shopping_list_validators)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Encabezado de la lista con la primera página de items; el resto se
+        pide a /items/ con el cursor de items_next.
+        """
+        shopping_list = self.get_object()
+        paginator = ShoppingListItemPagination()
+        page = paginator.paginate_queryset(self._items_queryset(shopping_list), request, view=self)
+        # El cursor siguiente apunta a /items/, no al detalle, con el mismo
+        # tamaño de página
+        items_url = self.reverse_action('items', args=[shopping_list.pk])
+        if paginator.page_size_query_param in request.query_params:
+            items_url = replace_query_param(items_url, paginator.page_size_query_param, paginator.page_size)
+        paginator.base_url = items_url
+        
+        return Response({
+            **self.get_serializer(shopping_list).data,
+            'items': ShoppingListItemSerializer(page, many=True).data,
+            'items_next': paginator.get_next_link(),
+        })
+    
+    @action(detail=True, methods=['get'])
+    @conditional_get(shopping_list_validators)
+    def items(self, request, pk=None):
+        """
+        Items de la lista paginados por cursor.
+        
+        Query params:
+        - cursor: cursor opaco de next/previous
+        - page_size: items por página (máximo 200)
+        """
+        shopping_list = self.get_object()
+        paginator = ShoppingListItemPagination()
+        page = paginator.paginate_queryset(self._items_queryset(shopping_list), request, view=self)
+        return paginator.get_paginated_response(ShoppingListItemSerializer(page, many=True).data)
+    
+    def _items_queryset(self, shopping_list):
+        return ShoppingListItem.objects.filter(shopping_list=shopping_list).select_related('product__sustainability')
+    
     @action(detail=True, methods=['post'])
+    @retry_on_lock
     def add_item(self, request, pk=None):
         """
         Agrega un item a la lista de compras.
@@ -55,35 +129,33 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            product = Product.objects.get(id=product_id)
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            return Response(
+                {'error': 'quantity debe ser un entero mayor o igual a 1'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            product = Product.objects.select_related('sustainability').get(id=product_id)
         except Product.DoesNotExist:
             return Response(
                 {'error': 'Producto no encontrado'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Verificar si el item ya existe
-        item, created = ShoppingListItem.objects.get_or_create(
-            shopping_list=shopping_list,
-            product=product,
-            defaults={
-                'quantity': quantity,
-                'price_at_addition': product.price,
-            }
-        )
-        
-        if not created:
-            # Si ya existe, actualizar cantidad
-            item.quantity += quantity
-            item.save()
-        
-        # Recalcular totales de la lista
-        self._update_shopping_list_totals(shopping_list)
+        # Incremento atómico (F('quantity') + n) o creación del item, con el
+        # delta de totales en la misma transacción; seguro ante llamadas
+        # concurrentes para el mismo producto
+        item, created = ShoppingListItem.objects.add_quantity(shopping_list.id, product, quantity)
         
         serializer = ShoppingListItemSerializer(item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['delete'])
+    @retry_on_lock
     def remove_item(self, request, pk=None):
         """
         Elimina un item de la lista.
@@ -103,14 +175,15 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            item = ShoppingListItem.objects.get(
-                id=item_id,
-                shopping_list=shopping_list
-            )
-            item.delete()
-            
-            # Recalcular totales
-            self._update_shopping_list_totals(shopping_list)
+            # El bloqueo de fila evita que dos eliminaciones simultáneas
+            # descuenten dos veces el mismo item de los totales
+            with transaction.atomic():
+                item = ShoppingListItem.objects.select_for_update().get(
+                    id=item_id,
+                    shopping_list=shopping_list
+                )
+                # Descuenta su aporte de los totales en la misma transacción
+                item.delete()
             
             return Response(status=status.HTTP_204_NO_CONTENT)
         except ShoppingListItem.DoesNotExist:
@@ -119,6 +192,155 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=True, methods=['post'], url_path='items/batch')
+    @retry_on_lock
+    def items_batch(self, request, pk=None):
+        """
+        Aplica varios cambios de items en una sola transacción.
+        
+        Body:
+        {
+            "add": [{"product_id": 1, "quantity": 2}, ...],
+            "update": [{"product_id": 3, "quantity": 5}, ...],
+            "remove": [4, 5]
+        }
+        
+        add suma a la cantidad actual (o crea el item); update fija la
+        cantidad de un item existente; remove recibe ids de producto.
+        """
+        shopping_list = self.get_object()
+        adds, updates, removals = self._parse_batch(request.data)
+        
+        if not (adds or updates or removals):
+            return Response(
+                {'error': 'Se requiere al menos un cambio (add, update o remove)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(adds) + len(updates) + len(removals) > self.MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'Máximo {self.MAX_BATCH_SIZE} productos por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        conflicts = (adds.keys() & updates.keys()) | ((adds.keys() | updates.keys()) & set(removals))
+        if conflicts:
+            return Response(
+                {'error': 'Un producto solo puede aparecer en una operación', 'product_ids': sorted(conflicts)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Los totales se recalculan una sola vez al cerrar la transacción
+        with ShoppingList.objects.deferred_totals(shopping_list.id):
+            existing = {
+                item.product_id: item
+                for item in ShoppingListItem.objects.select_for_update().filter(
+                    shopping_list=shopping_list,
+                    product_id__in=[*adds, *updates, *removals],
+                )
+            }
+            missing_items = [pid for pid in [*updates, *removals] if pid not in existing]
+            new_ids = [pid for pid in adds if pid not in existing]
+            products = Product.objects.select_related('sustainability').in_bulk(new_ids) if new_ids else {}
+            missing_products = [pid for pid in new_ids if pid not in products]
+            
+            if missing_items or missing_products:
+                # Nada escrito todavía: solo se informa
+                return Response(
+                    {
+                        'error': 'Productos no encontrados',
+                        'missing_products': missing_products,
+                        'missing_items': missing_items,
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            # Los add sobre items existentes suman en SQL (F('quantity') + n),
+            # así no pisan incrementos concurrentes de add_item
+            ShoppingListItem.objects.increment_many(
+                shopping_list.id,
+                {pid: quantity for pid, quantity in adds.items() if pid in existing},
+            )
+            
+            # Instancias nuevas (sin pk) para que el conflicto sea sobre
+            # (shopping_list, product) y actualice cantidad y subtotal
+            rows = []
+            for pid, quantity in [*adds.items(), *updates.items()]:
+                item = existing.get(pid)
+                if item is not None:
+                    if pid in adds:
+                        continue
+                    price, score = item.price_at_addition, item.score_at_addition
+                else:
+                    price = products[pid].price
+                    score = ShoppingListItem.product_score(products[pid])
+                rows.append(ShoppingListItem(
+                    shopping_list=shopping_list,
+                    product_id=pid,
+                    quantity=quantity,
+                    price_at_addition=price,
+                    subtotal=price * quantity,
+                    score_at_addition=score,
+                ))
+            
+            if rows:
+                ShoppingListItem.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['shopping_list', 'product'],
+                    update_fields=['quantity', 'subtotal'],
+                )
+            if removals:
+                ShoppingListItem.objects.filter(shopping_list=shopping_list, product_id__in=removals).delete()
+            # refresh() solo escribe si cambian los totales; el ETag de la
+            # lista debe cambiar igual
+            ShoppingList.objects.touch(shopping_list.id)
+        
+        shopping_list.refresh_from_db()
+        return Response({
+            'shopping_list': ShoppingListSummarySerializer(shopping_list).data,
+            'added': list(adds),
+            'updated': list(updates),
+            'removed': removals,
+        })
+    
+    def _parse_batch(self, data):
+        """
+        Valida el body de items_batch.
+        
+        Returns:
+            tuple: ({product_id: cantidad} a sumar, {product_id: cantidad} a
+            fijar, [product_id] a eliminar); los add repetidos se suman
+        """
+        def quantities(key):
+            entries = data.get(key) or []
+            if not isinstance(entries, list):
+                raise ValidationError({key: 'Debe ser una lista'})
+            result = {}
+            for entry in entries:
+                try:
+                    product_id = int(entry['product_id'])
+                    quantity = int(entry.get('quantity', 1))
+                except (TypeError, ValueError, KeyError, AttributeError):
+                    raise ValidationError({key: 'Cada elemento necesita product_id y quantity enteros'})
+                if quantity < 1:
+                    raise ValidationError({key: 'quantity debe ser al menos 1'})
+                if key == 'update' and product_id in result:
+                    raise ValidationError({key: f'Producto {product_id} repetido'})
+                result[product_id] = result.get(product_id, 0) + quantity
+            return result
+        
+        adds, updates = quantities('add'), quantities('update')
+        removals = data.get('remove') or []
+        try:
+            if not isinstance(removals, list):
+                raise TypeError
+            removals = list(dict.fromkeys(int(pid) for pid in removals))
+        except (TypeError, ValueError):
+            raise ValidationError({'remove': 'Debe ser una lista de product_id enteros'})
+        
+        return adds, updates, removals
+    
     @action(detail=False, methods=['post'])
     def optimize(self, request):
         """
@@ -135,68 +357,86 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
             ],
             "budget": 50000
         }
+        
+        Los product_id repetidos se suman en un solo item; los que no
+        existen se informan en not_found. Todos los productos se cargan con
+        una sola consulta antes de ejecutar el algoritmo.
         """
         items_data = request.data.get('items', [])
         budget = request.data.get('budget')
         
-        if not items_data:
+        if not items_data or not isinstance(items_data, list):
             return Response(
                 {'error': 'Lista de items es requerida'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if len(items_data) > self.MAX_OPTIMIZE_ITEMS:
+            return Response(
+                {'error': f'Máximo {self.MAX_OPTIMIZE_ITEMS} items por llamada'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         if not budget:
             return Response(
                 {'error': 'Presupuesto es requerido'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Preparar datos para el algoritmo
-        products_data = []
+        try:
+            budget = float(budget)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Presupuesto debe ser un número'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Cantidades por producto, en orden de aparición; los ids repetidos
+        # se suman en un solo item
+        quantities = {}
         for item in items_data:
             try:
-                product = Product.objects.select_related('sustainability').get(
-                    id=item['product_id']
+                product_id = int(item['product_id'])
+                quantity = int(item.get('quantity', 1))
+            except (TypeError, ValueError, KeyError, AttributeError):
+                return Response(
+                    {'error': 'Cada item necesita product_id y quantity enteros'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-                
-                sustainability_score = (
-                    product.sustainability.total_score
-                    if hasattr(product, 'sustainability')
-                    else 50
+            if quantity < 1:
+                return Response(
+                    {'error': 'quantity debe ser al menos 1'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-                
-                products_data.append({
-                    'product_id': product.id,
-                    'name': product.name,
-                    'price': float(product.price),
-                    'quantity': item.get('quantity', 1),
-                    'sustainability_score': sustainability_score,
-                    'weight': product.weight,
-                })
-            except Product.DoesNotExist:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        
+        # Una sola consulta para todos los productos (con su score)
+        products = Product.objects.select_related('sustainability').in_bulk(list(quantities))
+        
+        # Preparar datos para el algoritmo
+        products_data = []
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
                 continue
+            
+            sustainability_score = (
+                product.sustainability.total_score
+                if hasattr(product, 'sustainability')
+                else 50
+            )
+            
+            products_data.append({
+                'product_id': product.id,
+                'name': product.name,
+                'price': float(product.price),
+                'quantity': quantity,
+                'sustainability_score': sustainability_score,
+                'weight': product.weight,
+            })
         
         # Ejecutar algoritmo de optimización
-        result = knapsack_multi_objective(products_data, float(budget))
+        result = knapsack_multi_objective(products_data, budget)
+        result['not_found'] = [product_id for product_id in quantities if product_id not in products]
         
         return Response(result)
-    
-    def _update_shopping_list_totals(self, shopping_list):
-        """Actualiza los totales calculados de una lista"""
-        items = shopping_list.items.all().select_related('product__sustainability')
-        
-        total_price = sum(item.subtotal for item in items)
-        total_items = sum(item.quantity for item in items)
-        
-        # Calcular promedio de score
-        scores = [
-            item.product.sustainability.total_score
-            for item in items
-            if hasattr(item.product, 'sustainability')
-        ]
-        average_score = sum(scores) / len(scores) if scores else 0
-        
-        shopping_list.total_price = total_price
-        shopping_list.total_items = total_items
-        shopping_list.average_score = average_score
-        shopping_list.save()
\ No newline at end of file
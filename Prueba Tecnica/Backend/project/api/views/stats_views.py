@@ -1,8 +1,9 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from api.models.product import Product
-from api.models.sustainability import SustainabilityScore
+from api.services.stats import get_distributions, get_summary
+from api.views.response_cache import cache_catalog_response
+from api.serializers.fragment_cache import fragment_stats
 
 
 class StatsViewSet(viewsets.ViewSet):
@@ -11,37 +12,24 @@ class StatsViewSet(viewsets.ViewSet):
     """
     
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def summary(self, request):
         """
         Obtiene estadísticas generales del sistema.
         """
-        from django.db.models import Avg, Count, Min, Max
-        
-        total_products = Product.objects.count()
-        
-        # Estadísticas de sostenibilidad
-        sustainability_stats = SustainabilityScore.objects.aggregate(
-            avg_total=Avg('total_score'),
-            avg_economic=Avg('economic_score'),
-            avg_environmental=Avg('environmental_score'),
-            avg_social=Avg('social_score'),
-        )
-        
-        # Estadísticas de precios
-        price_stats = Product.objects.aggregate(
-            min_price=Min('price'),
-            max_price=Max('price'),
-            avg_price=Avg('price'),
-        )
-        
-        # Productos por categoría
-        products_by_category = Product.objects.values('category').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        return Response({
-            'total_products': total_products,
-            'sustainability_stats': sustainability_stats,
-            'price_stats': price_stats,
-            'products_by_category': list(products_by_category),
-        })
\ No newline at end of file
+        return Response(get_summary(request))
+    
+    @action(detail=False, methods=['get'])
+    def distributions(self, request):
+        """
+        Histogramas de scores/precio/carbono, cuantiles p10/p50/p90 por
+        categoría y reparto de calidad de datos.
+        """
+        return Response(get_distributions(request))
+    
+    @action(detail=False, methods=['get'])
+    def cache(self, request):
+        """
+        Tasa de aciertos de la caché de fragmentos de productos (por proceso).
+        """
+        return Response({'fragments': fragment_stats.snapshot()})
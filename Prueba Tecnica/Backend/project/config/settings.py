@@ -130,14 +130,44 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cachés
+# 'responses' guarda respuestas de endpoints de solo lectura del catálogo
+# (ver api/views/response_cache.py). Para compartirla entre procesos usar
+# 'django.core.cache.backends.filebased.FileBasedCache' con LOCATION = ruta.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'liquiverde-default',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'liquiverde-responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'liquiverde-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300  # segundos
+
+# 'fragments' guarda el JSON serializado de cada producto
+# (ver api/serializers/fragment_cache.py)
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
 # Configuracion de Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Usan orjson si está instalado; si no, equivalen a los de DRF
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'api.parsers.FastJSONParser',
     ],
 }
\ No newline at end of file
@@ -10,6 +10,8 @@ import {
   Badge,
   Group,
   RingProgress,
+  Table,
+  Anchor,
 } from '@mantine/core';
 import {
   IconShoppingCart,
@@ -18,11 +20,14 @@ import {
   IconLeaf,
 } from '@tabler/icons-react';
 import { BarChart } from '@mantine/charts';
-import { getStats } from '../services/api';
+import { Link } from 'react-router-dom';
+import { getDashboard } from '../services/api';
 import { notifications } from '@mantine/notifications';
 
 function Dashboard() {
   const [stats, setStats] = useState(null);
+  const [topProducts, setTopProducts] = useState([]);
+  const [recentLists, setRecentLists] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -32,8 +37,11 @@ function Dashboard() {
   const fetchStats = async () => {
     setLoading(true);
     try {
-      const data = await getStats();
-      setStats(data);
+      // Resumen, productos destacados y listas recientes en una sola llamada
+      const data = await getDashboard();
+      setStats(data.summary);
+      setTopProducts(data.top_products);
+      setRecentLists(data.recent_lists);
     } catch (error) {
       console.error('Error al cargar estadísticas:', error);
       notifications.show({
@@ -273,6 +281,78 @@ function Dashboard() {
         />
       </Card>
 
+      <Grid>
+        {/* Productos mejor evaluados */}
+        <Grid.Col span={{ base: 12, md: 6 }}>
+          <Card shadow="sm" padding="lg" radius="md" withBorder h="100%">
+            <Title order={3} mb="md">
+              Productos Mejor Evaluados
+            </Title>
+            <Table striped highlightOnHover>
+              <Table.Thead>
+                <Table.Tr>
+                  <Table.Th>Producto</Table.Th>
+                  <Table.Th>Categoría</Table.Th>
+                  <Table.Th>Score</Table.Th>
+                </Table.Tr>
+              </Table.Thead>
+              <Table.Tbody>
+                {topProducts.map((product) => (
+                  <Table.Tr key={product.id}>
+                    <Table.Td>
+                      <Anchor component={Link} to={`/product/${product.id}`} size="sm">
+                        {product.name}
+                      </Anchor>
+                    </Table.Td>
+                    <Table.Td>{product.category}</Table.Td>
+                    <Table.Td>
+                      <Badge color="green" variant="light">
+                        {product.sustainability_score?.toFixed(1)}
+                      </Badge>
+                    </Table.Td>
+                  </Table.Tr>
+                ))}
+              </Table.Tbody>
+            </Table>
+          </Card>
+        </Grid.Col>
+
+        {/* Listas de compras recientes */}
+        <Grid.Col span={{ base: 12, md: 6 }}>
+          <Card shadow="sm" padding="lg" radius="md" withBorder h="100%">
+            <Title order={3} mb="md">
+              Listas Recientes
+            </Title>
+            {recentLists.length === 0 ? (
+              <Text size="sm" c="dimmed">
+                Aún no hay listas de compras
+              </Text>
+            ) : (
+              <Table striped highlightOnHover>
+                <Table.Thead>
+                  <Table.Tr>
+                    <Table.Th>Lista</Table.Th>
+                    <Table.Th>Items</Table.Th>
+                    <Table.Th>Total</Table.Th>
+                    <Table.Th>Score</Table.Th>
+                  </Table.Tr>
+                </Table.Thead>
+                <Table.Tbody>
+                  {recentLists.map((list) => (
+                    <Table.Tr key={list.id}>
+                      <Table.Td>{list.name}</Table.Td>
+                      <Table.Td>{list.total_items}</Table.Td>
+                      <Table.Td>${Number(list.total_price).toFixed(0)}</Table.Td>
+                      <Table.Td>{list.average_score?.toFixed(1)}</Table.Td>
+                    </Table.Tr>
+                  ))}
+                </Table.Tbody>
+              </Table>
+            )}
+          </Card>
+        </Grid.Col>
+      </Grid>
+
       {/* Categorías en badges */}
       <Card shadow="sm" padding="lg" radius="md" withBorder>
         <Title order={3} mb="md">
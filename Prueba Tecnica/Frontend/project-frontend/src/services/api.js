@@ -29,16 +29,33 @@ export const searchProducts = async (query) => {
   return response.data;
 };
 
+export const getProductFacets = async (params = {}) => {
+  const response = await api.get('/products/facets/', { params });
+  return response.data;
+};
+
 export const getProductAlternatives = async (id) => {
   const response = await api.get(`/products/${id}/alternatives/`);
   return response.data;
 };
 
+export const getAlternativesBatch = async (productIds) => {
+  const response = await api.post('/products/alternatives-batch/', {
+    product_ids: productIds,
+  });
+  return response.data;
+};
+
 export const scanBarcode = async (barcode) => {
   const response = await api.post('/products/scan/', { barcode });
   return response.data;
 };
 
+export const bulkLookupProducts = async ({ ids = [], barcodes = [], detail = false } = {}) => {
+  const response = await api.post('/products/bulk/', { ids, barcodes, detail });
+  return response.data;
+};
+
 // ========== SHOPPING LISTS ==========
 
 export const getShoppingLists = async () => {
@@ -51,6 +68,14 @@ export const getShoppingList = async (id) => {
   return response.data;
 };
 
+// Páginas siguientes de items: pasar el cursor de items_next / next
+export const getShoppingListItems = async (id, cursor = null) => {
+  const response = await api.get(`/shopping-lists/${id}/items/`, {
+    params: cursor ? { cursor } : {},
+  });
+  return response.data;
+};
+
 export const createShoppingList = async (data) => {
   const response = await api.post('/shopping-lists/', data);
   return response.data;
@@ -86,4 +111,15 @@ export const getStats = async () => {
   return response.data;
 };
 
+export const getStatsDistributions = async () => {
+  const response = await api.get('/stats/distributions/');
+  return response.data;
+};
+
+// Resumen + productos destacados + listas recientes en una sola llamada
+export const getDashboard = async (params = {}) => {
+  const response = await api.get('/dashboard/', { params });
+  return response.data;
+};
+
 export default api;
\ No newline at end of file